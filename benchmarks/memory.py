@@ -0,0 +1,113 @@
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.projects import WORDS
+from gantty import storage
+from gantty.gantt import Project
+
+
+# Task layout before slots: attributes in the instance dict and the description on every task
+class PreviousTask:
+    def __init__(self, title, project, length=1, earliest_start=0, is_done=False):
+        self.title = title
+        self._is_done = is_done
+        self._length = length
+        self._earliest_start = earliest_start
+        self.description = ""
+
+        self.project = project
+
+
+# Project indexes before slots: a deps and a dependents list for every task, and the order in a dict
+class PreviousProject:
+    def __init__(self):
+        self.tasks = []
+        self._deps = {}
+        self._dependents = {}
+        self._order = {}
+        self._topo = []
+
+
+def make_file(count, file_name, seed=0):
+    # Titles repeat like in a real plan, one task in ten has a long description
+    rng = random.Random(seed)
+    project = Project("Memory")
+    for i in range(count):
+        task = project.add_task(" ".join(rng.sample(WORDS, 2)) + f" {i % 50}", rng.randint(1, 5))
+        if rng.random() < 0.1:
+            project.descriptions.set(task, "".join(rng.choice(WORDS) + " " for _ in range(80)))
+    tasks = project.tasks
+    project.bulk_link(
+        (tasks[i], tasks[dep]) for i in range(count) for dep in rng.sample(range(max(0, i - 20), i), min(i, 2))
+    )
+    storage.save(file_name, project)
+
+
+def read_columns(file_name):
+    # Numbers and strings of the file as plain lists, what the previous layout was built from
+    project, _ = storage.load(file_name)
+    index = {task: i for i, task in enumerate(project.tasks)}
+    return [
+        (
+            task.title,
+            task.length,
+            task.earliest_start,
+            task.is_done,
+            task.description,
+            [index[dep] for dep in task.deps],
+        )
+        for task in project.tasks
+    ]
+
+
+def build_previous(rows):
+    # Strings are copied, like decoding them from the file would
+    project = PreviousProject()
+    tasks = project.tasks
+    for title, length, earliest_start, is_done, description, _ in rows:
+        task = PreviousTask("".join(title), project, length, earliest_start, is_done)
+        task.description = "".join(description)
+        project._deps[task] = []
+        project._dependents[task] = []
+        project._order[task] = len(project._topo)
+        project._topo.append(task)
+        tasks.append(task)
+    for task, row in zip(tasks, rows):
+        for dep in row[5]:
+            project._deps[task].append(tasks[dep])
+            project._dependents[tasks[dep]].append(task)
+    return project
+
+
+def load_scheduled(file_name):
+    project, _ = storage.load(file_name)
+    project.analyse()
+    return project
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    result = build(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "memory.gantt")
+        make_file(count, file_name)
+        rows = read_columns(file_name)
+        print(f"{count} tasks, bytes per task")
+        print(f"previous layout:   {measure(build_previous, rows) / count:8.1f}")
+        print(f"project:           {measure(storage.load, file_name) / count:8.1f}")
+        print(f"scheduled project: {measure(load_scheduled, file_name) / count:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
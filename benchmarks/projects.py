@@ -0,0 +1,50 @@
+import random
+
+from gantty.gantt import Project
+
+WORDS = ["Design", "Review", "Implement", "Test", "Deploy", "Document", "API", "UI", "database", "release"]
+
+
+# Synthetic projects, each shape stresses the scheduler differently
+def chain(count, rng):
+    # One long path, every task depends on the previous one
+    return [[i - 1] if i else [] for i in range(count)]
+
+
+def fan(count, rng):
+    # One task everything waits on, and one that waits on everything
+    if count < 3:
+        return chain(count, rng)
+    middle = range(1, count - 1)
+    return [[]] + [[0] for _ in middle] + [list(middle)]
+
+
+def random_dag(count, rng, degree=2, window=100):
+    # Deps picked among recent tasks, like a plan written top to bottom
+    return [rng.sample(range(max(0, i - window), i), min(i, degree)) for i in range(count)]
+
+
+def diamonds(count, rng):
+    # Chained diamonds, two paths between every pair of joins
+    deps = []
+    for i in range(count):
+        if i % 3 == 0:
+            deps.append([i - 1, i - 2] if i else [])
+        else:
+            deps.append([i - i % 3])
+    return deps
+
+
+SHAPES = {"chain": chain, "fan": fan, "random": random_dag, "diamonds": diamonds}
+
+
+def make_project(shape, count, seed=0):
+    rng = random.Random(seed)
+    project = Project(f"{shape} {count}")
+    for i in range(count):
+        title = " ".join(rng.sample(WORDS, 2)) + f" {i}"
+        earliest_start = rng.randint(0, 10) if rng.random() < 0.05 else 0
+        project.add_task(title, rng.randint(1, 5), earliest_start, rng.random() < 0.2)
+    tasks = project.tasks
+    project.bulk_link((tasks[i], tasks[dep]) for i, deps in enumerate(SHAPES[shape](count, rng)) for dep in deps)
+    return project
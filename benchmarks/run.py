@@ -0,0 +1,206 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.projects import SHAPES, make_project
+from gantty import storage, ui
+from gantty.arrays import ArrayProject, np
+from gantty.screen import Frame, Screen
+
+SIZES = (100, 1_000, 10_000, 100_000)
+BACKENDS = ("project", "arrays")
+
+# Timings reported as slower than a baseline past this ratio, shorter ones than NOISE are left out
+REGRESSION = 1.2
+NOISE = 0.001
+
+# Columns of the summary printed while running
+SUMMARY = ("end", "analyse", "edit", "frame", "frame_bytes", "deps", "save", "load", "load_frame")
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def headless():
+    # The interface draws into a screen whose output is dropped, the frame still counts the bytes
+    ui.screen = Screen(Frame(sink=len))
+    ui.grid = ui.GridCache()
+
+
+def forget_schedule(project):
+    if isinstance(project, ArrayProject):
+        project._levels = None
+        project._changed(structure=True)
+    else:
+        project.schedule.clear()
+
+
+def draw(view, full=False):
+    # Returns the time and the bytes sent, a full frame also rebuilds the grid
+    if full:
+        ui.grid = ui.GridCache()
+        ui.screen.invalidate()
+    frame = ui.screen.frame
+    sent = frame.total_bytes
+    seconds, _ = timed(ui.draw, view)
+    return seconds, frame.total_bytes - sent
+
+
+def make_view(project, width, height):
+    view = ui.View(project)
+    view.width = width
+    view.height = height
+    return view
+
+
+def run_case(shape, count, backend, directory, width, height):
+    results = {"shape": shape, "tasks": count, "backend": backend}
+    results["build"], project = timed(make_project, shape, count)
+    if backend == "arrays":
+        seconds, project = timed(ArrayProject.from_project, project)
+        results["build"] += seconds
+
+    # Task.start for every task, then the critical path and the statuses
+    forget_schedule(project)
+    results["end"], _ = timed(lambda: project.end)
+    results["analyse"], _ = timed(project.analyse)
+
+    # Every shape starts with a task others depend on, growing it reschedules them
+    project.tasks[0].length += 1
+    results["edit"], _ = timed(lambda: (project.end, project.analyse()))
+
+    view = make_view(project, width, height)
+    results["frame"], results["frame_bytes"] = draw(view, full=True)
+    view.select_down()
+    results["move"], results["move_bytes"] = draw(view)
+    view.pan_down()
+    results["scroll"], results["scroll_bytes"] = draw(view)
+
+    # Dependency mode colors every row by its relation to a task in the middle of the project
+    view.current_task = count // 2
+    view.first_task = max(0, min(view.current_task - view.visible_tasks // 2, count - view.visible_tasks))
+    view.select_deps()
+    results["deps"], results["deps_bytes"] = draw(view)
+
+    file_name = os.path.join(directory, f"{shape}-{count}-{backend}.gantt")
+    results["save"], _ = timed(storage.save, file_name, project, view.settings())
+    results["file_bytes"] = os.path.getsize(file_name)
+    results["load"], (loaded, settings) = timed(storage.load, file_name, backend == "arrays")
+    results["load_frame"], _ = draw(make_view(loaded, width, height), full=True)
+    return results
+
+
+def best(runs):
+    # Fastest time of each measure, counts are the same in every run
+    results = dict(runs[0])
+    for run in runs[1:]:
+        for key, value in run.items():
+            if isinstance(value, float):
+                results[key] = min(results[key], value)
+    return results
+
+
+def case_key(results):
+    return results["shape"], results["tasks"], results["backend"]
+
+
+def compare(results, baseline):
+    old = {case_key(case): case for case in baseline["results"]}
+    slower = []
+    for case in results:
+        before = old.get(case_key(case))
+        if before is None:
+            continue
+        for key, value in case.items():
+            if isinstance(value, float) and value > NOISE and before.get(key) and value / before[key] > REGRESSION:
+                slower.append((case_key(case), key, before[key], value))
+    return slower
+
+
+def format_value(key, value):
+    if key.endswith("bytes"):
+        return f"{value:>11}"
+    return f"{value * 1000:9.2f}ms"
+
+
+def print_header(stream=sys.stderr):
+    print(" ".join(f"{key:>11}" for key in ("shape", "tasks", "backend") + SUMMARY), file=stream)
+
+
+def print_summary(results, stream=sys.stderr):
+    case = [f"{results[key]:>11}" for key in ("shape", "tasks", "backend")]
+    print(" ".join(case + [format_value(key, results[key]) for key in SUMMARY]), file=stream)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Time scheduling, drawing and saving on synthetic projects.")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case, the fastest is kept")
+    parser.add_argument("--width", type=int, default=200)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--output", help="JSON file for the results, standard output by default")
+    parser.add_argument("--baseline", help="results of an earlier run, slower timings are reported")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    backends = [backend for backend in args.backends if backend == "project" or np is not None]
+    headless()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+
+    results = []
+    print_header()
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            for count in args.sizes:
+                for backend in backends:
+                    runs = [
+                        run_case(shape, count, backend, directory, args.width, args.height) for _ in range(args.repeat)
+                    ]
+                    results.append(best(runs))
+                    print_summary(results[-1])
+
+    report = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__ if np is not None else None,
+        "width": args.width,
+        "height": args.height,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(report, stream, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if baseline is not None:
+        slower = compare(results, baseline)
+        for (shape, count, backend), key, before, after in slower:
+            print(
+                f"slower: {shape} {count} {backend} {key} {before * 1000:.2f}ms -> {after * 1000:.2f}ms",
+                file=sys.stderr,
+            )
+        if slower:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+import datetime
+import sys
+
+from gantty import instrument
+from gantty.gantt import Analysis, Project, Status, Task
+
+try:
+    import numpy as np  # type: ignore[import]
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+
+def _ranges(ptr, rows):
+    # Positions of the CSR entries of the given rows, and the row each one belongs to
+    counts = ptr[rows + 1] - ptr[rows]
+    owners = np.repeat(rows, counts)
+    firsts = np.repeat(ptr[rows] - np.cumsum(counts) + counts, counts)
+    return firsts + np.arange(counts.sum()), owners
+
+
+# Task view onto one row of an ArrayProject
+class TaskRow(Task):
+    __slots__ = ("row",)
+
+    def __init__(self, project, row):
+        self.project = project
+        self.row = row
+
+    @property
+    def title(self):
+        return self.project.titles[self.row]
+
+    @title.setter
+    def title(self, title):
+        project = self.project
+        project.titles[self.row] = sys.intern(title)
+        if project.search_index is not None:
+            project.search_index.rename(self)
+
+    @property
+    def description(self):
+        return self.project.descriptions.get(self.row, "")
+
+    @description.setter
+    def description(self, description):
+        self.project.descriptions[self.row] = description
+
+    @property
+    def is_done(self):
+        return bool(self.project.done[self.row])
+
+    @is_done.setter
+    def is_done(self, is_done):
+        self.project.done[self.row] = is_done
+        self.project._changed()
+
+    @property
+    def length(self):
+        return int(self.project.length[self.row])
+
+    @length.setter
+    def length(self, length):
+        self.project.length[self.row] = length
+        self.project._changed()
+
+    @property
+    def earliest_start(self):
+        return int(self.project.earliest_start[self.row])
+
+    @earliest_start.setter
+    def earliest_start(self, earliest_start):
+        self.project.earliest_start[self.row] = earliest_start
+        self.project._changed()
+
+    @property
+    def start(self):
+        instrument.count("Task.start")
+        return int(self.project.analyse().start[self.row])
+
+    @property
+    def end(self):
+        instrument.count("Task.end")
+        return int(self.project.analyse().end[self.row])
+
+    @property
+    def extra(self):
+        instrument.count("Task.extra")
+        return int(self.project.analyse().extra[self.row])
+
+    @property
+    def slack(self):
+        instrument.count("Task.slack")
+        return int(self.project.analyse().slack[self.row])
+
+    @property
+    def status(self):
+        instrument.count("Task.status")
+        return int(self.project.analyse().status[self.row])
+
+    @property
+    def deps(self):
+        project = self.project
+        return [project.tasks[row] for row in project.deps_of(self.row).tolist()]
+
+    @property
+    def dependents(self):
+        project = self.project
+        return [project.tasks[row] for row in project.dependents_of(self.row).tolist()]
+
+
+# Sequence of rows, each view is created once and kept while its row lives
+class TaskRows:
+    def __init__(self, project):
+        self.project = project
+        self.views = {}
+
+    def __len__(self):
+        return len(self.project.titles)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("task index out of range")
+        view = self.views.get(row)
+        if view is None:
+            view = self.views[row] = TaskRow(self.project, row)
+        return view
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def index(self, task):
+        if task.project is not self.project or task.row is None:
+            raise ValueError("task is not in the project")
+        return task.row
+
+    def insert(self, row):
+        self.views = {other + (other >= row): view for other, view in self.views.items()}
+        for other, view in self.views.items():
+            view.row = other
+
+    def remove(self, row):
+        views = {}
+        for other, view in self.views.items():
+            if other < row:
+                views[other] = view
+            elif other > row:
+                view.row = other - 1
+                views[other - 1] = view
+            else:
+                view.row = None
+        self.views = views
+
+
+# Strings kept encoded in a buffer, such as a mapped file, each one is decoded when first read
+class LazyStrings:
+    def __init__(self, data, starts, ends, intern=False):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+        self.intern = intern
+        self.decoded = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        text = self.decoded.get(row)
+        if text is None:
+            text = self.data[self.starts[row] : self.ends[row]].decode()
+            self.decoded[row] = text = sys.intern(text) if self.intern else text
+        return text
+
+    def __setitem__(self, row, text):
+        self.decoded[row] = text
+
+    def read(self, row):
+        # Like [row], without keeping the decoded string
+        text = self.decoded.get(row)
+        if text is None:
+            return self.data[self.starts[row] : self.ends[row]].decode()
+        return text
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def get(self, row, default=""):
+        if not 0 <= row < len(self):
+            return default
+        return self[row] or default
+
+    def append(self, text):
+        self.insert(len(self), text)
+
+    def insert(self, row, text):
+        self.starts = np.insert(self.starts, row, 0)
+        self.ends = np.insert(self.ends, row, 0)
+        self.decoded = {i + (i >= row): other for i, other in self.decoded.items()}
+        self.decoded[row] = text
+
+    def __delitem__(self, row):
+        self.starts = np.delete(self.starts, row)
+        self.ends = np.delete(self.ends, row)
+        self.decoded = {i - (i > row): text for i, text in self.decoded.items() if i != row}
+
+
+# Struct-of-arrays project, dependencies are CSR encoded (deps of row i are dep_idx[dep_ptr[i]:dep_ptr[i + 1]])
+class ArrayProject:
+    # Title index, see search.title_index()
+    search_index = None
+
+    def __init__(self, name, start_date=None):
+        if np is None:
+            raise ImportError("The array backend needs numpy")
+        self.name = name
+        self.start_date = start_date or datetime.date.today()
+
+        self.titles = []
+        self.descriptions = {}
+        self.length = np.zeros(0, dtype=np.int32)
+        self.earliest_start = np.zeros(0, dtype=np.int32)
+        self.done = np.zeros(0, dtype=bool)
+        self.dep_ptr = np.zeros(1, dtype=np.int32)
+        self.dep_idx = np.zeros(0, dtype=np.int32)
+
+        self.tasks = TaskRows(self)
+        self.revision = 0
+        self._analysis = None
+        self._reverse = None
+        self._levels = None
+
+    @classmethod
+    def from_columns(
+        cls, name, start_date, titles, length, earliest_start, done, dep_ptr, dep_idx, levels=None, analysis=None
+    ):
+        # Columns are copied, they may come from a read-only buffer, levels and analysis are kept as caches
+        project = cls(name, start_date)
+        project.titles = titles if isinstance(titles, LazyStrings) else [sys.intern(title) for title in titles]
+        project.length = np.array(length, dtype=np.int32)
+        project.earliest_start = np.array(earliest_start, dtype=np.int32)
+        project.done = np.array(done, dtype=bool)
+        project.dep_ptr = np.array(dep_ptr, dtype=np.int32)
+        project.dep_idx = np.array(dep_idx, dtype=np.int32)
+        if levels is not None:
+            project._levels = np.array(levels, dtype=np.int32)
+        project._analysis = analysis
+        return project
+
+    @classmethod
+    def from_project(cls, project):
+        index = {task: i for i, task in enumerate(project.tasks)}
+        deps = [[index[dep] for dep in task.deps] for task in project.tasks]
+        array_project = cls.from_columns(
+            project.name,
+            project.start_date,
+            [task.title for task in project.tasks],
+            [task.length for task in project.tasks],
+            [task.earliest_start for task in project.tasks],
+            [task.is_done for task in project.tasks],
+            np.cumsum([0] + [len(row) for row in deps]),
+            [dep for row in deps for dep in row],
+        )
+        array_project.descriptions = {i: task.description for i, task in enumerate(project.tasks) if task.description}
+        return array_project
+
+    def to_project(self):
+        project = Project(self.name)
+        project.start_date = self.start_date
+        for row, title in enumerate(self.titles):
+            task = project.add_task(title, int(self.length[row]), int(self.earliest_start[row]), bool(self.done[row]))
+            task.description = self.descriptions.get(row, "")
+        tasks = project.tasks
+        project.bulk_link((tasks[row], tasks[dep]) for row in range(len(tasks)) for dep in self.deps_of(row).tolist())
+        return project
+
+    def _changed(self, structure=False):
+        self.revision += 1
+        self._analysis = None
+        if structure:
+            self._reverse = None
+
+    # Edges
+    def deps_of(self, row):
+        return self.dep_idx[self.dep_ptr[row] : self.dep_ptr[row + 1]]
+
+    def dependents_of(self, row):
+        rev_ptr, rev_idx = self.reverse_edges()
+        return rev_idx[rev_ptr[row] : rev_ptr[row + 1]]
+
+    def edge_owners(self):
+        return np.repeat(np.arange(len(self.titles), dtype=np.int32), np.diff(self.dep_ptr))
+
+    def reverse_edges(self):
+        if self._reverse is None:
+            rev_ptr = np.zeros(len(self.titles) + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.dep_idx, minlength=len(self.titles)), out=rev_ptr[1:])
+            rev_idx = self.edge_owners()[np.argsort(self.dep_idx, kind="stable")]
+            self._reverse = rev_ptr, rev_idx
+        return self._reverse
+
+    def levels(self):
+        # Any labelling where every dep is lower than its dependents stays valid when edges are removed
+        if self._levels is None:
+            instrument.count("levels")
+            rev_ptr, rev_idx = self.reverse_edges()
+            remaining = np.diff(self.dep_ptr)
+            levels = np.zeros(len(self.titles), dtype=np.int32)
+            frontier = np.flatnonzero(remaining == 0)
+            level = 0
+            while frontier.size:
+                levels[frontier] = level
+                positions, _ = _ranges(rev_ptr, frontier)
+                reached = rev_idx[positions]
+                np.subtract.at(remaining, reached, 1)
+                reached = np.unique(reached)
+                frontier = reached[remaining[reached] == 0]
+                level += 1
+            self._levels = levels
+        return self._levels
+
+    def _link(self, task, dep):
+        levels = self._levels
+        if levels is not None and levels[dep.row] >= levels[task.row]:
+            self._levels = None
+        position = self.dep_ptr[task.row + 1]
+        self.dep_idx = np.insert(self.dep_idx, position, dep.row)
+        self.dep_ptr[task.row + 1 :] += 1
+        self._changed(structure=True)
+
+    def _unlink(self, task, dep):
+        first = self.dep_ptr[task.row]
+        position = first + np.flatnonzero(self.deps_of(task.row) == dep.row)[0]
+        self.dep_idx = np.delete(self.dep_idx, position)
+        self.dep_ptr[task.row + 1 :] -= 1
+        self._changed(structure=True)
+
+    def _reaches(self, source, target):
+        levels = self.levels()
+        upper = levels[target.row]
+        if levels[source.row] >= upper:
+            return False
+        instrument.count("reaches")
+        seen = {source.row}
+        stack = [source.row]
+        while stack:
+            for row in self.dependents_of(stack.pop()).tolist():
+                if row == target.row:
+                    instrument.count("reaches.visited", len(seen))
+                    return True
+                if row not in seen and levels[row] < upper:
+                    seen.add(row)
+                    stack.append(row)
+        instrument.count("reaches.visited", len(seen))
+        return False
+
+    def link(self, task, dep):
+        # Adds the edge as it is, without pruning or marking deps done, it must not close a cycle
+        self._link(task, dep)
+
+    def ancestors(self, task):
+        return self._walk(task.row, self.deps_of)
+
+    def descendants(self, task):
+        return self._walk(task.row, self.dependents_of)
+
+    def _walk(self, row, edges):
+        instrument.count("walk")
+        seen = {row}
+        stack = [row]
+        while stack:
+            for other in edges(stack.pop()).tolist():
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+                    yield self.tasks[other]
+        instrument.count("walk.visited", len(seen) - 1)
+
+    # Tasks
+    def add_task(self, title, length=1, earliest_start=0, is_done=False):
+        return self.insert_task(len(self.titles), title, length, earliest_start, is_done)
+
+    def insert_task(self, row, title, length=1, earliest_start=0, is_done=False):
+        # Rows from row on move down one, the new row has no edges
+        self.titles.insert(row, sys.intern(title))
+        if isinstance(self.descriptions, LazyStrings):
+            self.descriptions.insert(row, "")
+        else:
+            self.descriptions = {i + (i >= row): text for i, text in self.descriptions.items()}
+        self.length = np.insert(self.length, row, np.int32(length))
+        self.earliest_start = np.insert(self.earliest_start, row, np.int32(earliest_start))
+        self.done = np.insert(self.done, row, bool(is_done))
+        self.dep_ptr = np.insert(self.dep_ptr, row + 1, self.dep_ptr[row])
+        self.dep_idx[self.dep_idx >= row] += 1
+        if self._levels is not None:
+            self._levels = np.insert(self._levels, row, np.int32(0))
+        self.tasks.insert(row)
+        self._changed(structure=True)
+        if self.search_index is not None:
+            self.search_index.add(self.tasks[row])
+        return self.tasks[row]
+
+    def remove_task(self, to_delete):
+        if self.search_index is not None:
+            self.search_index.remove(to_delete)
+        levels = self.levels()
+        deps = sorted(to_delete.deps, key=lambda dep: levels[dep.row], reverse=True)
+        dependents = sorted(to_delete.dependents, key=lambda dependent: levels[dependent.row])
+        for dependent in dependents:
+            self._unlink(dependent, to_delete)
+        for dep in deps:
+            self._unlink(to_delete, dep)
+
+        # Splice the deps into the dependents, the levels already put them in between
+        for dependent in dependents:
+            for dep in deps:
+                if not self._reaches(dep, dependent):
+                    self._link(dependent, dep)
+
+        row = to_delete.row
+        del self.titles[row]
+        if isinstance(self.descriptions, LazyStrings):
+            del self.descriptions[row]
+        else:
+            self.descriptions = {i - (i > row): text for i, text in self.descriptions.items() if i != row}
+        self.length = np.delete(self.length, row)
+        self.earliest_start = np.delete(self.earliest_start, row)
+        self.done = np.delete(self.done, row)
+        self.dep_ptr = np.delete(self.dep_ptr, row + 1)
+        self.dep_idx[self.dep_idx > row] -= 1
+        if self._levels is not None:
+            self._levels = np.delete(self._levels, row)
+        self.tasks.remove(row)
+        self._changed(structure=True)
+
+    # Scheduling
+    @property
+    def end(self):
+        return self.analyse().project_end
+
+    def analyse(self):
+        instrument.count("analyse")
+        if self._analysis is None:
+            instrument.count("critical_path")
+            self._analysis = self._critical_path()
+        return self._analysis
+
+    def _critical_path(self):
+        size = len(self.titles)
+        levels = self.levels()
+        depth = int(levels.max()) + 1 if size else 0
+        owners = self.edge_owners()
+        deps = self.dep_idx
+        length = self.length.astype(np.int64)
+
+        # Rows and edges grouped by the level of the dependent
+        row_order = np.argsort(levels, kind="stable")
+        row_bounds = np.searchsorted(levels[row_order], np.arange(depth + 1))
+        edge_levels = levels[owners]
+        edge_order = np.argsort(edge_levels, kind="stable")
+        edge_bounds = np.searchsorted(edge_levels[edge_order], np.arange(depth + 1))
+
+        # Forward pass, one level at a time
+        start = self.earliest_start.astype(np.int64)
+        end = start + length
+        for level in range(1, depth):
+            rows = row_order[row_bounds[level] : row_bounds[level + 1]]
+            edges = edge_order[edge_bounds[level] : edge_bounds[level + 1]]
+            np.maximum.at(start, owners[edges], end[deps[edges]])
+            end[rows] = start[rows] + length[rows]
+        project_end = int(end.max()) if size else 0
+
+        # Free slack up to the earliest dependent, or the project end
+        first_start = np.full(size, project_end, dtype=np.int64)
+        np.minimum.at(first_start, deps, start[owners])
+        extra = first_start - end
+
+        # Backward pass, latest ends give the total slack
+        latest_end = np.full(size, project_end, dtype=np.int64)
+        for level in range(depth - 1, 0, -1):
+            edges = edge_order[edge_bounds[level] : edge_bounds[level + 1]]
+            dependents = owners[edges]
+            np.minimum.at(latest_end, deps[edges], latest_end[dependents] - length[dependents])
+        slack = latest_end - end
+
+        # Statuses, in increasing order of precedence
+        waiting = np.bincount(owners, weights=~self.done[deps], minlength=size) > 0
+        tight = np.bincount(deps, weights=extra[owners] == 0, minlength=size) > 0
+        status = np.full(size, Status.ONGOING, dtype=np.int8)
+        status[(end == project_end) | tight] = Status.CRITICAL
+        status[waiting] = Status.WAITING
+        status[self.done] = Status.DONE
+
+        return Analysis(start, end, extra, slack, status, project_end)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+
+from gantty import export, portfolio, storage
+
+
+# Commands that work on project files without a terminal, for scripts and scheduled jobs
+def export_command(args):
+    project, _, _ = storage.load_project(args.file, arrays=True)
+    write = export.FORMATS[args.format]
+    if args.output == "-":
+        write(project, sys.stdout)
+        return
+    with open(args.output, "w", encoding="utf-8", newline="") as stream:
+        write(project, stream)
+
+
+def schedule_command(args):
+    # Folds the journal into the file, saved with a fresh schedule so that opening it needs none
+    project, settings, journal = storage.load_project(args.file, repair=True)
+    project.analyse()
+    journal.reset(storage.save(args.file, project, settings))
+    print(f"{project.name}: {len(project.tasks)} tasks, ends {export.project_end(project).isoformat()}")
+
+
+def portfolio_command(args):
+    report = portfolio.analyse(args.paths, args.jobs)
+    write = portfolio.FORMATS[args.format]
+    if args.output == "-":
+        write(report, sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            write(report, stream)
+    if report["failed"]:
+        exit(1)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog="gantty-batch", description="Work with GanTTY project files without a terminal."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write the schedule of a project, one task at a time")
+    export_parser.add_argument("file")
+    export_parser.add_argument("-f", "--format", choices=sorted(export.FORMATS), default="csv")
+    export_parser.add_argument("-o", "--output", default="-", help="file to write, standard output by default")
+    export_parser.set_defaults(run=export_command)
+
+    schedule_parser = commands.add_parser("schedule", help="recompute the schedule and save it with the journal")
+    schedule_parser.add_argument("file")
+    schedule_parser.set_defaults(run=schedule_command)
+
+    portfolio_parser = commands.add_parser("portfolio", help="summarize many projects, loaded in parallel")
+    portfolio_parser.add_argument("paths", nargs="+", help="project files, or directories of .gantt files")
+    portfolio_parser.add_argument("-j", "--jobs", type=int, help="worker processes, one per core by default")
+    portfolio_parser.add_argument("-f", "--format", choices=sorted(portfolio.FORMATS), default="text")
+    portfolio_parser.add_argument("-o", "--output", default="-", help="file to write, standard output by default")
+    portfolio_parser.set_defaults(run=portfolio_command)
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    try:
+        args.run(args)
+    except BrokenPipeError:
+        # The reader went away, like head does, the rest of the output is dropped
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exit(1)
+    except IOError as error:
+        print(f"gantty-batch: {error}", file=sys.stderr)
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import csv
+import datetime
+import json
+
+from gantty.arrays import ArrayProject, LazyStrings
+from gantty.gantt import Status
+
+# Fields of an exported task, in CSV column order
+FIELDS = ("id", "title", "start", "end", "length", "earliest_start", "done", "status", "slack", "extra", "deps")
+
+STATUS_NAMES = {
+    Status.DONE: "done",
+    Status.ONGOING: "ongoing",
+    Status.WAITING: "waiting",
+    Status.CRITICAL: "critical",
+}
+
+# PlantUML color of critical tasks, like the interface
+PLANTUML_CRITICAL = "Gold"
+
+
+def columns(project):
+    # (title, length, earliest start, done, deps) of every task, nothing is kept once a row is read
+    if isinstance(project, ArrayProject):
+        titles = project.titles
+        read = titles.read if isinstance(titles, LazyStrings) else titles.__getitem__
+        for row in range(len(titles)):
+            yield (
+                read(row),
+                int(project.length[row]),
+                int(project.earliest_start[row]),
+                bool(project.done[row]),
+                project.deps_of(row).tolist(),
+            )
+        return
+    index = project.analyse().index
+    for task in project.tasks:
+        yield task.title, task.length, task.earliest_start, task.is_done, [index[dep] for dep in task.deps]
+
+
+def task_rows(project):
+    # One dict per task in file order, dates are the first and last day of the task
+    analysis = project.analyse()
+    day = datetime.timedelta(days=1)
+    for i, (title, length, earliest_start, done, deps) in enumerate(columns(project)):
+        start = project.start_date + int(analysis.start[i]) * day
+        yield {
+            "id": i,
+            "title": title,
+            "start": start.isoformat(),
+            "end": (start + (length - 1) * day).isoformat(),
+            "length": length,
+            "earliest_start": earliest_start,
+            "done": done,
+            "status": STATUS_NAMES[int(analysis.status[i])],
+            "slack": int(analysis.slack[i]),
+            "extra": int(analysis.extra[i]),
+            "deps": deps,
+        }
+
+
+def project_end(project):
+    return project.start_date + datetime.timedelta(days=int(project.analyse().project_end))
+
+
+def write_csv(project, stream):
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for row in task_rows(project):
+        row["deps"] = " ".join(map(str, row["deps"]))
+        writer.writerow(row[field] for field in FIELDS)
+
+
+def write_json(project, stream):
+    # One task per line inside a single document
+    header = {
+        "name": project.name,
+        "start_date": project.start_date.isoformat(),
+        "end": project_end(project).isoformat(),
+    }
+    stream.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "tasks": [')
+    for row in task_rows(project):
+        stream.write(("," if row["id"] else "") + "\n" + json.dumps(row, ensure_ascii=False))
+    stream.write("\n]}\n")
+
+
+def write_plantuml(project, stream):
+    # Tasks are declared first, then linked, so that deps can refer to any task
+    stream.write(f"@startgantt\ntitle {plantuml_name(project.name)}\nProject starts {project.start_date.isoformat()}\n")
+    for row in task_rows(project):
+        alias = f"[T{row['id']}]"
+        stream.write(f"[{plantuml_name(row['title'])}] as {alias} lasts {row['length']} days\n")
+        stream.write(f"{alias} starts {row['start']}\n")
+        if row["done"]:
+            stream.write(f"{alias} is 100% completed\n")
+        elif row["status"] == "critical":
+            stream.write(f"{alias} is colored in {PLANTUML_CRITICAL}\n")
+    for i, (_, _, _, _, deps) in enumerate(columns(project)):
+        for dep in deps:
+            stream.write(f"[T{dep}] -> [T{i}]\n")
+    stream.write("@endgantt\n")
+
+
+def plantuml_name(text):
+    # Brackets end a task name and lines end a statement
+    return " ".join(text.replace("[", "(").replace("]", ")").split())
+
+
+FORMATS = {"csv": write_csv, "json": write_json, "plantuml": write_plantuml}
@@ -1,4 +1,7 @@
 import datetime
+import sys
+
+from gantty import instrument
 
 
 class Status:
@@ -8,66 +11,487 @@ class Status:
     CRITICAL = 3
 
 
+# Whole-project critical path analysis, indexed like project.tasks
+class Analysis:
+    def __init__(self, start, end, extra, slack, status, project_end, index=None):
+        self.start = start
+        self.end = end
+        self.extra = extra
+        self.slack = slack
+        self.status = status
+        self.project_end = project_end
+        self.index = index
+
+
+# Scheduling engine
+class Schedule:
+    def __init__(self, project):
+        self.project = project
+        self.revision = 0
+        self._end = None
+        self._analysis = None
+
+        # Number of tasks whose start had to be recomputed
+        self.recomputed = 0
+
+    def start(self, task):
+        # Cached on the task itself, None when it needs recomputing
+        if task._start is not None:
+            return task._start
+
+        # Compute the missing starts bottom-up, without recursion
+        recomputed = self.recomputed
+        stack = [task]
+        while stack:
+            top = stack[-1]
+            if top._start is not None:
+                stack.pop()
+                continue
+            pending = [dep for dep in top.deps if dep._start is None]
+            if pending:
+                stack += pending
+                continue
+            stack.pop()
+            start = top.earliest_start
+            for dep in top.deps:
+                end = dep._start + dep.length
+                if start < end:
+                    start = end
+            top._start = start
+            self.recomputed += 1
+        instrument.count("start.recomputed", self.recomputed - recomputed)
+        return task._start
+
+    def end(self, task):
+        return self.start(task) + task.length
+
+    @property
+    def project_end(self):
+        if self._end is None:
+            instrument.count("project_end")
+            self._end = max((self.end(task) for task in self.project.tasks), default=0)
+        return self._end
+
+    def analyse(self):
+        instrument.count("analyse")
+        if self._analysis is None:
+            instrument.count("critical_path")
+            self._analysis = self._critical_path()
+        return self._analysis
+
+    def _critical_path(self):
+        tasks = self.project.tasks
+        index = {task: i for i, task in enumerate(tasks)}
+        order = self.project.topological_order()
+        starts = [0] * len(tasks)
+        ends = [0] * len(tasks)
+        extras = [0] * len(tasks)
+        slacks = [0] * len(tasks)
+        statuses = [Status.ONGOING] * len(tasks)
+
+        # Forward pass
+        for task in order:
+            i = index[task]
+            starts[i] = self.start(task)
+            ends[i] = starts[i] + task.length
+        end = self.project_end
+
+        # Backward pass, latest ends give the total slack
+        latest_starts = {}
+        for task in reversed(order):
+            i = index[task]
+            extra = latest_end = -1
+            for dependent in task.dependents:
+                j = index[dependent]
+                if starts[j] - ends[i] < extra or extra == -1:
+                    extra = starts[j] - ends[i]
+                if latest_starts[dependent] < latest_end or latest_end == -1:
+                    latest_end = latest_starts[dependent]
+            if extra == -1:
+                extra = end - ends[i]
+                latest_end = end
+            extras[i] = extra
+            slacks[i] = latest_end - ends[i]
+            latest_starts[task] = latest_end - task.length
+
+        # Statuses, once every extra is known
+        for i, task in enumerate(tasks):
+            if task.is_done:
+                status = Status.DONE
+            elif not all(dep.is_done for dep in task.deps):
+                status = Status.WAITING
+            elif ends[i] == end or not all(extras[index[dependent]] for dependent in task.dependents):
+                status = Status.CRITICAL
+            else:
+                status = Status.ONGOING
+            statuses[i] = status
+
+        return Analysis(starts, ends, extras, slacks, statuses, end, index)
+
+    def invalidate_status(self):
+        self._analysis = None
+        self.revision += 1
+
+    def invalidate(self, task=None):
+        self._end = None
+        self.invalidate_status()
+
+        # A cached task always has cached deps, so the cone stops at the first uncached task
+        stack = [task] if task is not None else []
+        invalidated = 0
+        while stack:
+            task = stack.pop()
+            if task._start is not None:
+                task._start = None
+                stack += task.dependents
+                invalidated += 1
+        instrument.count("invalidated", invalidated)
+
+    def clear(self):
+        for task in self.project.tasks:
+            task._start = None
+        self._end = None
+        self.invalidate_status()
+
+
+# Task descriptions, kept apart from the tasks and only read when needed
+class Descriptions:
+    def __init__(self):
+        self.texts = {}
+        self.loaders = {}
+
+    def get(self, task):
+        if task in self.loaders:
+            self.texts[task] = self.loaders.pop(task)()
+        return self.texts.get(task, "")
+
+    def set(self, task, text):
+        self.loaders.pop(task, None)
+        if text:
+            self.texts[task] = text
+        else:
+            self.texts.pop(task, None)
+
+    def defer(self, task, loader):
+        self.texts.pop(task, None)
+        self.loaders[task] = loader
+
+    def remove(self, task):
+        self.texts.pop(task, None)
+        self.loaders.pop(task, None)
+
+
 class Project:
+    # Title index, see search.title_index()
+    search_index = None
+
     def __init__(self, name):
         self.name = name
         self.tasks = []
         self.start_date = datetime.date.today()
+        self.descriptions = Descriptions()
+
+        # Dependency index, forward (task -> deps) and reverse (task -> dependents), tasks without edges are left out
+        self._deps = {}
+        self._dependents = {}
+
+        # Topological order, kept up to date as edges are added, each task knows its position
+        self._topo = []
+
+        self.schedule = Schedule(self)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        # Pickled files kept the deps and descriptions on each task, see Task.__setstate__
+        legacy = self.__dict__.pop("_legacy", {})
+        self.descriptions = Descriptions()
+        for task, (_, description) in legacy.items():
+            self.descriptions.set(task, description)
+        self._deps = {}
+        self._dependents = {}
+        self._index((task, dep) for task in self.tasks for dep in legacy[task][0] or [])
+        self._sort()
+        self.schedule = Schedule(self)
+        self.schedule.clear()
 
     def add_task(self, title, length=1, earliest_start=0, is_done=False):
-        self.tasks.append(Task(title, self, length, earliest_start, is_done))
+        return self.insert_task(len(self.tasks), title, length, earliest_start, is_done)
+
+    def insert_task(self, index, title, length=1, earliest_start=0, is_done=False):
+        # A task without edges can go last in the topological order
+        task = Task(title, self, length, earliest_start, is_done)
+        task._position = len(self._topo)
+        self._topo.append(task)
+        self.tasks.insert(index, task)
+        self.schedule.invalidate()
+        if self.search_index is not None:
+            self.search_index.add(task)
+        return task
 
     def remove_task(self, to_delete):
         for i in range(len(self.tasks)):
             if self.tasks[i] is to_delete:
-                for dependent in to_delete.dependents:
-                    dependent.remove_dep(dependent)
-                    dependent.deps += to_delete.deps
+                if self.search_index is not None:
+                    self.search_index.remove(to_delete)
+                deps = sorted(to_delete.deps, key=Task.position, reverse=True)
+                dependents = sorted(to_delete.dependents, key=Task.position)
+                for dependent in dependents:
+                    self._unlink(dependent, to_delete)
+                for dep in deps:
+                    self._unlink(to_delete, dep)
+
+                # Splice the deps into the dependents, the order already puts them in between
+                for dependent in dependents:
+                    for dep in deps:
+                        if not self._reaches(dep, dependent):
+                            self._link(dependent, dep)
+
+                self.schedule.invalidate(to_delete)
+                self.descriptions.remove(to_delete)
+                self._topo[to_delete._position] = None
                 del self.tasks[i]
+                if len(self._topo) > 2 * len(self.tasks):
+                    self._sort()
                 return
 
+    def topological_order(self):
+        return [task for task in self._topo if task is not None]
+
+    def _sort(self):
+        waiting = {task: len(self._deps.get(task, ())) for task in self.tasks}
+        order = [task for task, count in waiting.items() if not count]
+        for task in order:
+            for dependent in self._dependents.get(task, ()):
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    order.append(dependent)
+        for position, task in enumerate(order):
+            task._position = position
+        self._topo = order
+
+    def _reaches(self, source, target):
+        # Only tasks ordered between source and target can be on a path
+        upper = target._position
+        if source._position >= upper:
+            return False
+        instrument.count("reaches")
+        seen = {source}
+        stack = [source]
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent is target:
+                    instrument.count("reaches.visited", len(seen))
+                    return True
+                if dependent not in seen and dependent._position < upper:
+                    seen.add(dependent)
+                    stack.append(dependent)
+        instrument.count("reaches.visited", len(seen))
+        return False
+
+    def _region(self, task, edges, inside):
+        seen = {task}
+        stack = [task]
+        while stack:
+            for other in edges.get(stack.pop(), ()):
+                if other not in seen and inside(other._position):
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def _reorder(self, task, dep):
+        # Pearce-Kelly: move dep and its ancestors in front of task and its descendants
+        lower, upper = task._position, dep._position
+        after = self._region(task, self._dependents, lambda position: position < upper)
+        before = self._region(dep, self._deps, lambda position: position > lower)
+        moved = sorted(before, key=Task.position) + sorted(after, key=Task.position)
+        instrument.count("reorder.moved", len(moved))
+        for position, other in zip(sorted(other._position for other in moved), moved):
+            other._position = position
+            self._topo[position] = other
+
+    def bulk_link(self, edges):
+        # Adds (task, dep) pairs without cycle checks or pruning, then sorts once
+        self._index(edges)
+        self._sort()
+        self.schedule.clear()
+
+    def _index(self, edges):
+        deps = {}
+        dependents = {}
+        for task, dep in edges:
+            deps.setdefault(task, []).append(dep)
+            dependents.setdefault(dep, []).append(task)
+        for task, others in deps.items():
+            self._deps[task] = self._deps.get(task, ()) + tuple(others)
+        for dep, others in dependents.items():
+            self._dependents[dep] = self._dependents.get(dep, ()) + tuple(others)
+
+    # Index entries are tuples, they are small and degrees are low
+    def _link(self, task, dep):
+        if dep._position > task._position:
+            self._reorder(task, dep)
+        self._deps[task] = self._deps.get(task, ()) + (dep,)
+        self._dependents[dep] = self._dependents.get(dep, ()) + (task,)
+        self.schedule.invalidate(task)
+
+    def _unlink(self, task, dep):
+        self._deps[task] = tuple(other for other in self._deps[task] if other is not dep)
+        if not self._deps[task]:
+            del self._deps[task]
+        self._dependents[dep] = tuple(other for other in self._dependents[dep] if other is not task)
+        if not self._dependents[dep]:
+            del self._dependents[dep]
+        self.schedule.invalidate(task)
+
+    def link(self, task, dep):
+        # Adds the edge as it is, without pruning or marking deps done, it must not close a cycle
+        self._link(task, dep)
+
+    def ancestors(self, task):
+        return self._walk(task, self._deps)
+
+    def descendants(self, task):
+        return self._walk(task, self._dependents)
+
+    def _walk(self, task, edges):
+        instrument.count("walk")
+        seen = {task}
+        stack = [task]
+        while stack:
+            for other in edges.get(stack.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+                    yield other
+        instrument.count("walk.visited", len(seen) - 1)
+
+    def check_index(self):
+        tasks = set(self.tasks)
+        if len(tasks) != len(self.tasks) or not tasks >= self._deps.keys() or not tasks >= self._dependents.keys():
+            raise ValueError("Dependency index does not match the task list")
+        if not all(self._deps.values()) or not all(self._dependents.values()):
+            raise ValueError("Empty entry in the dependency index")
+        edges = {(task, dep) for task, deps in self._deps.items() for dep in deps}
+        reverse_edges = {(task, dep) for dep, dependents in self._dependents.items() for task in dependents}
+        if edges != reverse_edges:
+            raise ValueError("Forward and reverse dependency indexes differ")
+        if len(edges) != sum(len(deps) for deps in self._deps.values()):
+            raise ValueError("Duplicate dependency in the index")
+        if len(reverse_edges) != sum(len(dependents) for dependents in self._dependents.values()):
+            raise ValueError("Duplicate dependent in the index")
+        if self.topological_order() != sorted(self.tasks, key=Task.position):
+            raise ValueError("Topological positions do not match the order")
+        if any(self._topo[task._position] is not task for task in self.tasks):
+            raise ValueError("Task position out of date")
+        if any(dep._position >= task._position for task, dep in edges):
+            raise ValueError("Dependency ordered after its dependent")
+        return True
+
     @property
     def end(self):
-        return max(task.end for task in self.tasks)
+        return self.schedule.project_end
+
+    @property
+    def revision(self):
+        return self.schedule.revision
+
+    def analyse(self):
+        return self.schedule.analyse()
 
 
 class Task:
+    __slots__ = ("_title", "_is_done", "_length", "_earliest_start", "_start", "_position", "project")
+
     def __init__(self, title, project, length=1, earliest_start=0, is_done=False):
 
         # Basic attributes
-        self.title = title
-        self.is_done = is_done
-        self.length = length
-        self.earliest_start = earliest_start
-        self.description = ""
+        self._title = sys.intern(title)
+        self._is_done = is_done
+        self._length = length
+        self._earliest_start = earliest_start
+
+        # Cached start and topological position, managed by the project
+        self._start = None
+        self._position = 0
 
-        self.deps = []
         self.project = project
 
+    def __setstate__(self, state):
+        self._start = None
+        self._position = 0
+
+        # Pickled files hold a __dict__, the project picks up the deps and description when it loads
+        legacy = state["project"].__dict__.setdefault("_legacy", {})
+        legacy[self] = state.pop("deps", None), state.pop("description", "")
+        for name in ("title", "is_done", "length", "earliest_start"):
+            if name in state:
+                state["_" + name] = state.pop(name)
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def title(self):
+        return self._title
+
+    @title.setter
+    def title(self, title):
+        self._title = sys.intern(title)
+        if self.project.search_index is not None:
+            self.project.search_index.rename(self)
+
+    @property
+    def description(self):
+        return self.project.descriptions.get(self)
+
+    @description.setter
+    def description(self, description):
+        self.project.descriptions.set(self, description)
+
+    @property
+    def is_done(self):
+        return self._is_done
+
+    @is_done.setter
+    def is_done(self, is_done):
+        self._is_done = is_done
+        self.project.schedule.invalidate_status()
+
+    @property
+    def length(self):
+        return self._length
+
+    @length.setter
+    def length(self, length):
+        self._length = length
+        self.project.schedule.invalidate(self)
+
+    @property
+    def earliest_start(self):
+        return self._earliest_start
+
+    @earliest_start.setter
+    def earliest_start(self, earliest_start):
+        self._earliest_start = earliest_start
+        self.project.schedule.invalidate(self)
+
     @property
     def status(self):
-        if self.is_done:
-            return Status.DONE
-        for dep in self.deps:
-            if not dep.is_done:
-                return Status.WAITING
-        if self.end == self.project.end:
-            return Status.CRITICAL
-        for dependent in self.dependents:
-            if not dependent.extra:
-                return Status.CRITICAL
-        return Status.ONGOING
+        instrument.count("Task.status")
+        analysis = self.project.analyse()
+        return analysis.status[analysis.index[self]]
 
     @property
     def extra(self):
-        if len(self.dependents):
-            extra = -1
-            for dependent in self.dependents:
-                if dependent.start - self.end < extra or extra == -1:
-                    extra = dependent.start - self.end
-        else:
-            extra = self.project.end - self.end
-        return extra
+        instrument.count("Task.extra")
+        analysis = self.project.analyse()
+        return analysis.extra[analysis.index[self]]
+
+    @property
+    def slack(self):
+        instrument.count("Task.slack")
+        analysis = self.project.analyse()
+        return analysis.slack[analysis.index[self]]
 
     @property
     def total_length(self):
@@ -75,49 +499,51 @@ class Task:
 
     @property
     def end(self):
-        return self.start + self.length
+        instrument.count("Task.end")
+        return self.project.schedule.end(self)
 
     @property
     def start(self):
-        start = self.earliest_start
-        for dep in self.deps:
-            if start < dep.end:
-                start = dep.end
-        return start
+        instrument.count("Task.start")
+        return self.project.schedule.start(self)
+
+    @property
+    def deps(self):
+        return self.project._deps.get(self, ())
 
     @property
     def dependents(self):
-        return [task for task in self.project.tasks if self in task.deps]
+        return self.project._dependents.get(self, ())
+
+    def position(self):
+        return self._position
 
     def has_dependent(self, task):
-        for dependent in self.dependents:
-            if dependent == task or dependent.has_dependent(task):
-                return True
-        return False
+        return self.project._reaches(self, task)
 
     def has_dep(self, task):
-        for dep in self.deps:
-            if dep == task or dep.has_dep(task):
-                return True
-        return False
+        return self.project._reaches(task, self)
 
     def set_dep(self, new_dep):
         if new_dep == self or new_dep.has_dep(self) or self.has_dep(new_dep):
             return False
-        for dep in new_dep.deps:
-            if self.has_dep(dep):
+
+        # Drop the edges the new one makes redundant
+        for dep in list(self.deps):
+            if dep.has_dependent(new_dep):
                 self.remove_dep(dep)
-        for dependent in self.dependents:
-            if dependent.has_dep(new_dep):
+        for dependent in list(new_dep.dependents):
+            if self.has_dependent(dependent):
                 dependent.remove_dep(new_dep)
-        self.deps.append(new_dep)
+
+        self.project._link(self, new_dep)
         if self.is_done:
             new_dep.set_done()
         return True
 
     def remove_dep(self, old_dep):
         if old_dep in self.deps:
-            del self.deps[self.deps.index(old_dep)]
+            self.project._unlink(self, old_dep)
 
     def toggle_dep(self, toggle):
         if self.has_dep(toggle):
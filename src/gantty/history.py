@@ -0,0 +1,30 @@
+import collections
+
+# Undo steps kept by default
+DEPTH = 200
+
+
+# Undo and redo stacks, a step is the journal records of an edit and the records that revert it
+class History:
+    def __init__(self, depth=DEPTH):
+        self.undos = collections.deque(maxlen=depth)
+        self.redos = []
+
+    def push(self, records, inverse):
+        self.undos.append((records, inverse))
+        self.redos.clear()
+
+    def undo(self):
+        # The step to revert, None when there is nothing to undo
+        if not self.undos:
+            return None
+        step = self.undos.pop()
+        self.redos.append(step)
+        return step
+
+    def redo(self):
+        if not self.redos:
+            return None
+        step = self.redos.pop()
+        self.undos.append(step)
+        return step
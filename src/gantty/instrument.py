@@ -0,0 +1,83 @@
+import json
+import time
+
+# Opt-in counters and phase timers, while collection is off they cost one check
+enabled = False
+
+# Counts and phase times since the last frame ended
+counters: dict[str, int] = {}
+phases: dict[str, float] = {}
+
+# Record of the last frame, and how many frames were recorded
+last = None
+frames = 0
+
+# JSON lines file the frame records are appended to, None when not logging
+log = None
+
+
+def count(name, amount=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+# Time spent in a block, added up when the block runs more than once in a frame
+class Phase:
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        if enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if enabled and self.start:
+            phases[self.name] = phases.get(self.name, 0) + time.perf_counter() - self.start
+
+
+def end_frame(**stats):
+    # Closes the frame with the given stats, what happens after is counted in the next one
+    global last, frames
+    if not enabled:
+        return
+    frames += 1
+    last = dict(frame=frames, time=time.time(), phases=dict(phases), counters=dict(counters), **stats)
+    counters.clear()
+    phases.clear()
+    if log is not None:
+        log.write(json.dumps(last) + "\n")
+
+
+def enable(on=True):
+    # Logging keeps collection on
+    global enabled, last
+    enabled = on or log is not None
+    if not enabled:
+        last = None
+        counters.clear()
+        phases.clear()
+
+
+def start_log(path):
+    global log
+    log = open(path, "a", buffering=1)
+    enable()
+
+
+def stop_log():
+    global log
+    if log is not None:
+        log.close()
+        log = None
+
+
+def summary():
+    # One line for the info bar, times in milliseconds
+    if last is None:
+        return "profiling"
+    parts = [f"{name} {seconds * 1000:.1f}ms" for name, seconds in last["phases"].items()]
+    parts.append(f"{last['bytes']}B {last['writes']}w")
+    parts.extend(f"{name} {amount}" for name, amount in sorted(last["counters"].items()))
+    return " | ".join(parts)
@@ -0,0 +1,126 @@
+import json
+import os
+
+FORMAT = "gantty-journal"
+VERSION = 1
+
+
+# Edits made since the last snapshot, appended to "<file>.journal" as JSON lines
+class Journal:
+    def __init__(self, file_name, snapshot=None):
+        self.path = file_name + ".journal"
+
+        # Id of the snapshot the records apply to, None when the file has none yet
+        self.snapshot = snapshot
+
+        # Records not written yet, and the size of those that are
+        self.pending = []
+        self.bytes = 0
+
+    def record(self, *record):
+        self.pending.append(record)
+
+    def flush(self):
+        self.write(self.take())
+
+    def take(self):
+        # Pending records, to be written with write(), possibly from another thread
+        records = self.pending
+        self.pending = []
+        return records
+
+    def write(self, records):
+        if not records:
+            return
+        lines = []
+        if not self.bytes:
+            lines.append(json.dumps({"format": FORMAT, "version": VERSION, "snapshot": self.snapshot}))
+        lines.extend(json.dumps(record, ensure_ascii=False) for record in records)
+        data = ("\n".join(lines) + "\n").encode()
+
+        # A fresh journal replaces whatever was left from an older snapshot
+        with open(self.path, "ab" if self.bytes else "wb") as stream:
+            stream.write(data)
+            stream.flush()
+            os.fsync(stream.fileno())
+        self.bytes += len(data)
+
+    def reset(self, snapshot, done=None):
+        # The first done pending records, or all of them, are part of a new snapshot
+        self.snapshot = snapshot
+        del self.pending[:done]
+        self.bytes = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def replay(self, project, repair=True):
+        # Applies the records written for this snapshot, returns how many were applied
+        try:
+            stream = open(self.path, "r+b" if repair else "rb")
+        except FileNotFoundError:
+            return 0
+        count = 0
+        with stream:
+            header = read_line(stream)
+            if header is None or header.get("format") != FORMAT or header.get("snapshot") != self.snapshot:
+                return 0
+            if header["version"] > VERSION:
+                raise ValueError(f"Journal version {header['version']} is newer than this version of gantty")
+            end = stream.tell()
+            for record in iter(lambda: read_line(stream), None):
+                apply_record(project, record)
+                count += 1
+                end = stream.tell()
+
+            # Drop a record cut short by a crash, new records go after the last complete one
+            if repair:
+                stream.truncate(end)
+            self.bytes = end
+        return count
+
+
+def read_line(stream):
+    # None at the end, or for a last line cut short by a crash
+    line = stream.readline()
+    if not line.endswith(b"\n"):
+        return None
+    return json.loads(line)
+
+
+def apply_record(project, record):
+    op, *args = record
+    tasks = project.tasks
+    if op == "add":
+        project.add_task(*args)
+    elif op == "delete":
+        project.remove_task(tasks[args[0]])
+    elif op == "title":
+        tasks[args[0]].title = args[1]
+    elif op == "length":
+        tasks[args[0]].length = args[1]
+    elif op == "description":
+        tasks[args[0]].description = args[1]
+    elif op == "done":
+        if args[1]:
+            tasks[args[0]].set_done()
+        else:
+            tasks[args[0]].set_not_done()
+    elif op == "dep":
+        tasks[args[0]].toggle_dep(tasks[args[1]])
+
+    # Records written by undo, they change one thing each without the side effects of the edits above
+    elif op == "insert":
+        index, title, length, earliest_start, is_done, description = args
+        task = project.insert_task(index, title, length, earliest_start, is_done)
+        if description:
+            task.description = description
+    elif op == "is_done":
+        tasks[args[0]].is_done = args[1]
+    elif op == "link":
+        project.link(tasks[args[0]], tasks[args[1]])
+    elif op == "unlink":
+        tasks[args[0]].remove_dep(tasks[args[1]])
+    else:
+        raise ValueError(f"Unknown journal record {op!r}")
@@ -38,3 +38,73 @@ class Keybindings:
     DELETE_TASK = "D"
 
     WRITE_TO_FILE = "W"
+
+    UNDO = "u"
+    REDO = "U"
+
+    # Search, typed keys go to the query until it is accepted or cancelled
+    SEARCH = "/"
+    SEARCH_ACCEPT = ("\r", "\n")
+    SEARCH_CANCEL = "\x1b"
+    SEARCH_BACKSPACE = ("\x7f", "\x08")
+    SEARCH_NEXT = ("\x0e", "\x1b[B", "\x1bOB")  # Ctrl-N and down
+    SEARCH_PREVIOUS = ("\x10", "\x1b[A", "\x1bOA")  # Ctrl-P and up
+
+    TOGGLE_PROFILE = "P"
+
+    # Keys applied once for a whole run of repeats
+    REPEATABLE = (PAN_UP, PAN_DOWN, PAN_LEFT, PAN_RIGHT, SELECT_UP, SELECT_DOWN)
+
+    # Keys that take over the terminal for a prompt or an editor
+    MODAL = (QUIT, ADD_TASK, RENAME_TASK, EDIT_TASK, DELETE_TASK)
+
+    # Escape sequences of special keys, read as the keys above outside of a search
+    ESCAPE_SEQUENCES = {
+        "\x1b[A": SELECT_UP,
+        "\x1b[B": SELECT_DOWN,
+        "\x1b[C": PAN_RIGHT,
+        "\x1b[D": PAN_LEFT,
+        "\x1bOA": SELECT_UP,
+        "\x1bOB": SELECT_DOWN,
+        "\x1bOC": PAN_RIGHT,
+        "\x1bOD": PAN_LEFT,
+        "\x1b[5~": PAN_UP,
+        "\x1b[6~": PAN_DOWN,
+        "\x1b[H": PAN_START,
+    }
+
+
+def split_keys(text, final=False):
+    # Splits input into keys, escape sequences are kept whole, one cut short is returned as the rest unless final
+    keys = []
+    i = 0
+    while i < len(text):
+        if text[i] != "\x1b":
+            keys.append(text[i])
+            i += 1
+            continue
+        end = escape_end(text, i)
+        if end is None:
+            if not final:
+                return keys, text[i:]
+            end = len(text)
+        keys.append(text[i:end])
+        i = end
+    return keys, ""
+
+
+def escape_end(text, i):
+    # End of the escape sequence starting at i, None when incomplete
+    if i + 1 >= len(text):
+        return None
+    if text[i + 1] == "[":
+        # Control sequence: parameters and intermediates up to a final byte
+        for j in range(i + 2, len(text)):
+            if "@" <= text[j] <= "~":
+                return j + 1
+        return None
+    if text[i + 1] == "O":
+        return i + 3 if i + 2 < len(text) else None
+
+    # Alt and a key
+    return i + 2
@@ -1,3 +1,6 @@
+import asyncio
+import codecs
+import os
 import pickle
 import signal
 import sys
@@ -6,19 +9,41 @@ import traceback
 import tty
 from dataclasses import dataclass
 
+from gantty import instrument, storage
 from gantty.gantt import Project
-from gantty.keys import Keybindings
+from gantty.history import DEPTH, History
+from gantty.journal import Journal
+from gantty.keys import Keybindings, split_keys
+from gantty.search import build_index
 from gantty.ui import (
+    SaveJob,
     View,
-    clear,
+    apply,
+    apply_keys,
     draw,
+    emit,
     get_input_text,
     on_resize,
-    process,
-    reset,
-    write,
 )
 
+# Seconds to wait for the rest of an escape sequence
+ESCAPE_TIMEOUT = 0.05
+
+# File to append a JSON line per frame to, with the timings and counts of the profiling overlay
+PROFILE_ENV = "GANTTY_PROFILE"
+
+# Number of edits that can be undone
+HISTORY_ENV = "GANTTY_HISTORY"
+
+# Most frames drawn per second
+FPS_ENV = "GANTTY_FPS"
+
+# Seconds between saves of unsaved edits, not set or 0 to only save on W
+AUTOSAVE_ENV = "GANTTY_AUTOSAVE"
+
+# Open version 2 files as an ArrayProject, which starts faster on huge files but edits slower
+ARRAYS_ENV = "GANTTY_ARRAYS"
+
 
 def get_file_name():
     if len(sys.argv) < 2:
@@ -31,79 +56,325 @@ def get_file_name():
 @dataclass
 class RuntimeInfo:
     file_name: str = ""  # get_file_name()
-    file_descriptor: int = sys.stdin.fileno()
+    file_descriptor: int = 0  # Standard input, see from_terminal()
     end_clear: bool = False
-    old_settings: tuple = tuple(termios.tcgetattr(sys.stdin.fileno()))
+    old_settings: tuple = ()
     exception_traceback: str = ""
+    resized: bool = False
+    fps: int = 60
+    autosave: float = 0  # Seconds between autosaves, 0 to disable
+    history: int = DEPTH  # Undo steps kept
+    arrays: bool = False  # Open files with the array backend
+
+    @classmethod
+    def from_terminal(cls, **kwargs):
+        # The terminal is only read when the interface starts, so that the module can be imported anywhere
+        fd = sys.stdin.fileno()
+        return cls(file_descriptor=fd, old_settings=tuple(termios.tcgetattr(fd)), **kwargs)
 
 
-def create_view(file_name):
+def create_view(file_name, arrays=False):
     try:
-        with open(file_name, "rb") as gantt_file:
-            view = pickle.load(gantt_file)
-            print(view)
-        if not isinstance(view, View):
-            raise TypeError("Could not read file correctly!")
-        view.unsaved_edits = False
+        project, settings = storage.load(file_name, arrays)
+        header = storage.read_header(file_name)
     except (FileNotFoundError, EOFError):
         view = View(Project("New Project"))
-    except pickle.UnpicklingError:
+        view.journal = Journal(file_name)
+        return view
+    except (ValueError, KeyError, TypeError, pickle.UnpicklingError):
         raise IOError("Could not read file correctly!")
+    view = View(project)
+    view.restore(settings)
+
+    # Edits saved after the project file was written
+    view.journal = Journal(file_name, header and header.get("id"))
+    try:
+        view.journal.replay(project)
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise IOError("Could not read the journal correctly!")
+    view.unsaved_edits = False
     return view
 
 
-def main_loop(info_obj):
+def confirm_quit(view, info_obj):
+    if not view.unsaved_edits:
+        return True
+    confirm = get_input_text(
+        view,
+        "About to quit with unsaved edits! Are you sure you want to continue? ",
+        info_obj.file_descriptor,
+        list(info_obj.old_settings),
+    )
+    return confirm.lower() == "yes"
 
-    view = create_view(info_obj.file_name)
 
-    # Redraw on resize
-    signal.signal(signal.SIGWINCH, lambda signum, frame: on_resize(view))
+# Input, resizes, rendering and timers sharing one asyncio loop
+class EventLoop:
+    def __init__(self, view, info_obj):
+        self.view = view
+        self.info = info_obj
+        self.loop = None
+        self.done = None
 
-    # Hide the cursor
-    write("\x1b[?25l")
+        # Input not applied yet
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.pending = ""
+        self.keys = []
+        self.escape_handle = None
 
-    # Draw the screen
-    info_obj.end_clear = True
-    draw(view)
-
-    # Read input
-    while True:
-        char = sys.stdin.read(1)
-        if char == Keybindings.QUIT:
-            if view.unsaved_edits:
-                confirm = get_input_text(
-                    view,
-                    "About to quit with unsaved edits! Are you sure you want to continue? ",
-                    info_obj.file_descriptor,
-                    list(info_obj.old_settings),
+        # Rendering, at most fps frames per second
+        self.msg = ""
+        self.frame_handle = None
+        self.last_frame = 0
+
+        # A prompt or the editor owns the terminal
+        self.modal = False
+
+        # Background save, and whether another one was asked for meanwhile
+        self.saving = False
+        self.save_again = False
+
+        # Building the title index
+        self.indexing = None
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.done = self.loop.create_future()
+        self.loop.add_reader(self.info.file_descriptor, self.guard, self.on_input)
+        self.loop.add_signal_handler(signal.SIGWINCH, self.on_resize)
+        self.indexing = self.loop.create_task(self.index_titles())
+        if self.info.autosave:
+            self.every(self.info.autosave, self.autosave)
+        self.render()
+        try:
+            return await self.done
+        finally:
+            self.loop.remove_reader(self.info.file_descriptor)
+            self.loop.remove_signal_handler(signal.SIGWINCH)
+            for handle in (self.frame_handle, self.escape_handle):
+                if handle is not None:
+                    handle.cancel()
+
+    def guard(self, callback, *args):
+        # Errors end the loop, so that main() can restore the terminal and show them
+        try:
+            callback(*args)
+        except Exception as error:
+            if not self.done.done():
+                self.done.set_exception(error)
+
+    def every(self, seconds, callback):
+        def tick():
+            self.guard(callback)
+            self.loop.call_later(seconds, tick)
+
+        self.loop.call_later(seconds, tick)
+
+    async def index_titles(self):
+        # The title index is built on a worker thread, so that the first search key does not wait for it
+        project = self.view.project
+        build = build_index(project)
+        try:
+            project.search_index = await self.loop.run_in_executor(None, build)
+        except Exception as error:
+            if not self.done.done():
+                self.done.set_exception(error)
+
+    # Input
+
+    def on_input(self):
+        self.pending += self.decoder.decode(os.read(self.info.file_descriptor, 4096))
+        self.split_pending()
+
+    def split_pending(self, final=False):
+        if self.escape_handle is not None:
+            self.escape_handle.cancel()
+            self.escape_handle = None
+        keys, self.pending = split_keys(self.pending, final)
+        self.keys += keys
+
+        # Wait a little for the rest of an escape sequence, a lone escape is flushed after that
+        if self.pending:
+            self.escape_handle = self.loop.call_later(ESCAPE_TIMEOUT, self.guard, self.split_pending, True)
+        self.apply_keys()
+
+    def apply_keys(self):
+        while self.keys and not self.modal:
+            special = self.special_key()
+            end = len(self.keys) if special is None else special
+            if end:
+                self.msg = apply_keys(
+                    self.view, self.keys[:end], self.info.file_descriptor, self.info.old_settings, self.info.file_name
                 )
-                if confirm.lower() == "yes":
-                    break
-            else:
+                self.request_frame()
+            if special is None:
+                self.keys = []
                 break
-        process(view, char, info_obj.file_descriptor, list(info_obj.old_settings), info_obj.file_name)
+            char = self.keys[end]
+            self.keys = self.keys[end + 1 :]
+            if char == Keybindings.WRITE_TO_FILE:
+                self.start_save()
+            else:
+                self.start_modal(char)
+
+    def special_key(self):
+        # Index of the first key the loop handles itself, keys typed into a search never are
+        searching = self.view.search is not None
+        for i, char in enumerate(self.keys):
+            if searching:
+                searching = char not in Keybindings.SEARCH_ACCEPT + (Keybindings.SEARCH_CANCEL,)
+            elif char == Keybindings.SEARCH:
+                searching = bool(self.view.project.tasks)
+            elif char in Keybindings.MODAL + (Keybindings.WRITE_TO_FILE,):
+                return i
+        return None
+
+    def start_modal(self, char):
+        # The prompt shows over the current state, stdin is handed to it until it returns
+        self.render()
+        self.modal = True
+
+        # Keys read after the prompt key are typed into it, those after its Enter come back as commands
+        self.view.typed_ahead = self.keys
+        self.keys = []
+        self.loop.remove_reader(self.info.file_descriptor)
+        self.loop.create_task(self.run_modal(char))
+
+    async def run_modal(self, char):
+        try:
+            if char == Keybindings.QUIT:
+                if await self.loop.run_in_executor(None, confirm_quit, self.view, self.info):
+                    self.done.set_result(self.info)
+                    return
+            else:
+                self.msg = await self.loop.run_in_executor(
+                    None,
+                    apply,
+                    self.view,
+                    char,
+                    self.info.file_descriptor,
+                    list(self.info.old_settings),
+                    self.info.file_name,
+                )
+        except Exception as error:
+            self.done.set_exception(error)
+            return
+        self.modal = False
+        self.keys = self.view.typed_ahead + self.keys
+        self.view.typed_ahead = []
+        self.loop.add_reader(self.info.file_descriptor, self.guard, self.on_input)
+        self.request_frame()
+        self.guard(self.apply_keys)
+
+    # Rendering
+
+    def on_resize(self):
+        self.info.resized = True
+        self.request_frame()
+
+    def request_frame(self):
+        if self.frame_handle is None:
+            delay = max(0, self.last_frame + 1 / self.info.fps - self.loop.time())
+            self.frame_handle = self.loop.call_later(delay, self.guard, self.render)
+
+    def render(self):
+        if self.frame_handle is not None:
+            self.frame_handle.cancel()
+            self.frame_handle = None
+        if self.modal:
+            return
+        if self.info.resized:
+            self.info.resized = False
+            on_resize(self.view)
+        self.last_frame = self.loop.time()
+        draw(self.view, self.msg)
+
+    # Saving, the file is written on a worker thread while input keeps being handled
+
+    def start_save(self):
+        if self.saving:
+            self.save_again = True
+        else:
+            self.saving = True
+            self.loop.create_task(self.save())
 
-    return info_obj
+    async def save(self):
+        try:
+            while True:
+                self.save_again = False
+                job = SaveJob(self.view, self.info.file_name, self.report_progress)
+                self.show("Saving…")
+                try:
+                    await self.loop.run_in_executor(None, job.run)
+                except OSError as error:
+                    job.fail()
+                    self.show(f"Could not save: {error}")
+                    return
+                job.finish()
+                if not self.save_again:
+                    break
+            self.show("Project saved!")
+        except Exception as error:
+            self.done.set_exception(error)
+        finally:
+            self.saving = False
+
+    def report_progress(self, fraction):
+        # Called from the worker thread
+        self.loop.call_soon_threadsafe(self.show, f"Saving… {int(fraction * 100)}%")
+
+    def show(self, msg):
+        self.msg = msg
+        self.request_frame()
+
+    # Timers
+
+    def autosave(self):
+        if self.view.unsaved_edits and not self.modal:
+            self.start_save()
+
+
+def main_loop(info_obj):
+
+    view = create_view(info_obj.file_name, info_obj.arrays)
+    view.history = History(info_obj.history)
+
+    # Hide the cursor
+    emit("\x1b[?25l")
+
+    # Draw the screen and run until quit
+    info_obj.end_clear = True
+    return asyncio.run(EventLoop(view, info_obj).run())
 
 
 def restore_terminal(info_obj):
-    reset()
+    emit("\x1b[39;49m")
     if info_obj.end_clear:
-        clear()
-    write("\x1b[?25h\n\r")
+        emit("\x1b[2J\x1b[1;1H")
+    emit("\x1b[?25h\n\r")
     termios.tcsetattr(info_obj.file_descriptor, termios.TCSADRAIN, list(info_obj.old_settings))
     print(info_obj.exception_traceback)
 
 
 def main():
 
-    runtime_info = RuntimeInfo(file_name=get_file_name())
+    runtime_info = RuntimeInfo.from_terminal(
+        file_name=get_file_name(),
+        fps=max(int(os.environ.get(FPS_ENV, RuntimeInfo.fps)), 1),
+        autosave=float(os.environ.get(AUTOSAVE_ENV, RuntimeInfo.autosave)),
+        history=int(os.environ.get(HISTORY_ENV, DEPTH)),
+        arrays=bool(os.environ.get(ARRAYS_ENV)),
+    )
+    if os.environ.get(PROFILE_ENV):
+        instrument.start_log(os.environ[PROFILE_ENV])
     tty.setraw(sys.stdin)
 
     try:
         runtime_info = main_loop(runtime_info)
     except Exception:
         runtime_info.exception_traceback = traceback.format_exc()
+    finally:
+        instrument.stop_log()
 
     restore_terminal(runtime_info)
 
@@ -0,0 +1,100 @@
+import concurrent.futures
+import datetime
+import json
+import os
+
+from gantty import storage
+from gantty.gantt import Status
+
+# Extension of the project files found in a directory
+EXTENSION = ".gantt"
+
+# Files handed to a worker at once, per worker, fewer round trips without starving the last ones
+CHUNKS_PER_WORKER = 4
+
+
+# Summaries of many projects, each project is loaded and scheduled in its own process
+def project_files(paths):
+    # Files as given, and the project files in the directories given
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(EXTENSION):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def summarize(file_name):
+    # Runs in a worker, only the small summary goes back
+    try:
+        project, _, _ = storage.load_project(file_name, arrays=True)
+    except IOError as error:
+        return {"file": file_name, "error": str(error)}
+    analysis = project.analyse()
+    statuses = analysis.status
+    end = project.start_date + datetime.timedelta(days=int(analysis.project_end))
+    return {
+        "file": file_name,
+        "name": project.name,
+        "tasks": len(project.tasks),
+        "done": sum(1 for status in statuses if status == Status.DONE),
+        "critical": sum(1 for status in statuses if status == Status.CRITICAL),
+        "total_slack": int(sum(analysis.slack)),
+        "start_date": project.start_date.isoformat(),
+        "end": end.isoformat(),
+    }
+
+
+def analyse(paths, workers=None):
+    files = list(project_files(paths))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) < 2:
+        return merge(map(summarize, files))
+    chunksize = max(1, len(files) // (workers * CHUNKS_PER_WORKER))
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(files))) as executor:
+        return merge(executor.map(summarize, files, chunksize=chunksize))
+
+
+def merge(summaries):
+    # One report for the whole portfolio, with the summary of every project in the order given
+    projects = []
+    failed = []
+    for summary in summaries:
+        (failed if "error" in summary else projects).append(summary)
+    last = max(projects, key=lambda summary: summary["end"], default=None)
+    return {
+        "projects": len(projects),
+        "tasks": sum(summary["tasks"] for summary in projects),
+        "done": sum(summary["done"] for summary in projects),
+        "critical": sum(summary["critical"] for summary in projects),
+        "total_slack": sum(summary["total_slack"] for summary in projects),
+        "end": last and last["end"],
+        "last_project": last and last["name"],
+        "summaries": projects,
+        "failed": failed,
+    }
+
+
+def write_text(report, stream):
+    columns = ("name", "tasks", "done", "critical", "total_slack", "end")
+    widths = [max([len(column)] + [len(str(summary[column])) for summary in report["summaries"]]) for column in columns]
+    rows = [columns] + [[summary[column] for column in columns] for summary in report["summaries"]]
+    for row in rows:
+        stream.write("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip() + "\n")
+    stream.write(
+        f"\n{report['projects']} projects, {report['tasks']} tasks, {report['done']} done, "
+        f"{report['critical']} critical, {report['total_slack']} days of slack\n"
+    )
+    if report["end"]:
+        stream.write(f"Last to end: {report['last_project']} on {report['end']}\n")
+    for summary in report["failed"]:
+        stream.write(f"Failed: {summary['error']}\n")
+
+
+def write_json(report, stream):
+    json.dump(report, stream, indent=1, ensure_ascii=False)
+    stream.write("\n")
+
+
+FORMATS = {"text": write_text, "json": write_json}
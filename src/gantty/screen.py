@@ -0,0 +1,258 @@
+import os
+import sys
+import unicodedata
+
+from gantty import instrument
+
+DEFAULT_COLOR = 9
+
+# Merge changed spans separated by fewer unchanged cells than this, a cursor move costs more
+SPAN_GAP = 6
+
+
+# Output of one frame, collected and sent to the terminal with a single write
+class Frame:
+    def __init__(self, fd=None, sink=None):
+        self.fd = fd
+        self.sink = sink
+        self.parts = []
+
+        # Terminal cursor and colors, None when unknown
+        self.cursor = None
+        self.colors = None
+
+        # Stats of the last flush, and totals
+        self.bytes = 0
+        self.writes = 0
+        self.frames = 0
+        self.total_bytes = 0
+        self.total_writes = 0
+
+    def move(self, x, y):
+        if self.cursor != (x, y):
+            self.parts.append(f"\x1b[{y + 1};{x + 1}H")
+            self.cursor = (x, y)
+
+    def set_colors(self, fg, bg):
+        colors = fg, bg
+        if colors != self.colors:
+            self.parts.append(sgr(colors, self.colors))
+            self.colors = colors
+
+    def write(self, text, width=None):
+        # Width is the number of cells the text takes, when it is not its length
+        self.parts.append(text)
+        if self.cursor is not None:
+            self.cursor = (self.cursor[0] + (len(text) if width is None else width), self.cursor[1])
+
+    def raw(self, text):
+        self.parts.append(text)
+        self.cursor = None
+        self.colors = None
+
+    def flush(self):
+        data = memoryview("".join(self.parts).encode())
+        self.parts.clear()
+        self.bytes = len(data)
+        self.writes = 0
+        with instrument.Phase("write"):
+            while data:
+                data = data[self._write(data) :]
+                self.writes += 1
+        self.frames += 1
+        self.total_bytes += self.bytes
+        self.total_writes += self.writes
+
+    def _write(self, data):
+        if self.sink is not None:
+            return self.sink(data)
+        return os.write(sys.stdout.fileno() if self.fd is None else self.fd, data)
+
+
+# Double buffered screen: frames are drawn into the back buffer, present() sends what changed
+class Screen:
+    def __init__(self, frame=None):
+        self.frame = frame or Frame()
+        self.width = 0
+        self.height = 0
+
+        # Back buffer, one entry per cell
+        self.chars = []
+        self.fgs = []
+        self.bgs = []
+
+        # What the terminal shows, None when unknown
+        self.front = None
+
+        # Drawing cursor and colors
+        self.x = 0
+        self.y = 0
+        self.fg = DEFAULT_COLOR
+        self.bg = DEFAULT_COLOR
+
+    def resize(self, width, height):
+        if width != self.width or height != self.height:
+            self.width = width
+            self.height = height
+            self.clear()
+            self.invalidate()
+
+    def invalidate(self):
+        self.front = None
+
+    def clear(self):
+        size = self.width * self.height
+        self.chars = [" "] * size
+        self.fgs = [DEFAULT_COLOR] * size
+        self.bgs = [DEFAULT_COLOR] * size
+        self.x = 0
+        self.y = 0
+
+    def snapshot(self):
+        return self.chars[:], self.fgs[:], self.bgs[:]
+
+    def restore(self, cells):
+        # Replaces the back buffer with a snapshot of the same size
+        chars, fgs, bgs = cells
+        self.chars = chars[:]
+        self.fgs = fgs[:]
+        self.bgs = bgs[:]
+        self.x = 0
+        self.y = 0
+
+    def move(self, x, y):
+        self.x = x
+        self.y = y
+
+    def write(self, text):
+        # Text that is not ASCII is split into cells first, see cells()
+        if not text.isascii():
+            text = cells(text)
+        x = self.x
+        self.x += len(text)
+        if not 0 <= self.y < self.height:
+            return
+        if x < 0:
+            text = text[-x:]
+            x = 0
+        room = max(self.width - x, 0)
+        split = len(text) > room and text[room] == ""
+        text = text[:room]
+        if text:
+            row = self.y * self.width
+            i = row + x
+            j = i + len(text)
+            chars = self.chars
+
+            # Halves of wide characters are blanked when the other half is cut off or drawn over
+            if chars[i] == "" and i > row:
+                chars[i - 1] = " "
+            chars[i:j] = text
+            if chars[i] == "":
+                chars[i] = " "
+            if split:
+                chars[j - 1] = " "
+            if j < row + self.width and chars[j] == "":
+                chars[j] = " "
+            self.fgs[i:j] = [self.fg] * len(text)
+            self.bgs[i:j] = [self.bg] * len(text)
+
+    def emit(self, text):
+        # Raw output, bypasses the buffers
+        self.frame.raw(text)
+        self.frame.flush()
+
+    def present(self):
+        width = self.width
+        if self.front is None:
+            self.frame.raw("\x1b[2J")
+            size = width * self.height
+            self.front = [None] * size, [None] * size, [None] * size
+        front_chars, front_fgs, front_bgs = self.front
+        chars, fgs, bgs = self.chars, self.fgs, self.bgs
+
+        for y in range(self.height):
+            a = y * width
+            b = a + width
+            if chars[a:b] == front_chars[a:b] and fgs[a:b] == front_fgs[a:b] and bgs[a:b] == front_bgs[a:b]:
+                continue
+            changed = [
+                i - a
+                for i in range(a, b)
+                if chars[i] != front_chars[i] or fgs[i] != front_fgs[i] or bgs[i] != front_bgs[i]
+            ]
+            first = last = changed[0]
+            for x in changed[1:] + [None]:
+                if x is not None and x - last <= SPAN_GAP:
+                    last = x
+                    continue
+                self._span(y, first, last)
+                first = last = x
+
+        self.front = chars[:], fgs[:], bgs[:]
+        if self.frame.parts:
+            self.frame.flush()
+
+    def _span(self, y, first, last):
+        frame = self.frame
+        frame.move(first, y)
+        start = y * self.width + first
+        end = (y + 1) * self.width
+        chars, fgs, bgs = self.chars, self.fgs, self.bgs
+        for i in range(start, start + last - first + 1):
+            # The right half of a wide character is drawn with the left one
+            char = chars[i]
+            if char:
+                frame.set_colors(fgs[i], bgs[i])
+                frame.write(char, 2 if i + 1 < end and chars[i + 1] == "" else 1)
+
+        # The cursor is left pending a wrap after the last column
+        if last + 1 >= self.width:
+            frame.cursor = None
+
+
+def char_width(char):
+    # Cells a character takes: combining marks none, wide and fullwidth characters two
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in "WF" else 1
+
+
+def cells(text):
+    # One string per cell, a wide character is followed by an empty one and combining marks stay with their base
+    result = []
+    for char in text:
+        width = char_width(char)
+        if width == 0 and result:
+            result[-2 if result[-1] == "" else -1] += char
+        else:
+            result.append(char)
+            if width == 2:
+                result.append("")
+    return result
+
+
+def text_width(text):
+    return len(text) if text.isascii() else len(cells(text))
+
+
+def clip(text, width):
+    # Longest start of the text that fits in width cells
+    if text.isascii():
+        return text[:width]
+    used = 0
+    for i, char in enumerate(text):
+        used += char_width(char)
+        if used > width:
+            return text[:i]
+    return text
+
+
+def sgr(colors, previous=None):
+    fg, bg = colors
+    codes = []
+    if previous is None or fg != previous[0]:
+        codes.append(str(fg + 30))
+    if previous is None or bg != previous[1]:
+        codes.append(str(bg + 40))
+    return f"\x1b[{';'.join(codes)}m"
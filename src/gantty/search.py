@@ -0,0 +1,163 @@
+import bisect
+import threading
+
+# Queries this long or longer are looked up by trigrams anywhere in a title, shorter ones by word prefix
+GRAM = 3
+
+# Largest sort key of a word
+LAST = "\U0010ffff"
+
+# Matches up to this many are sorted by row, more are found by scanning the titles from the cursor
+SORTED = 2000
+
+
+# Title index of a project, kept up to date by the project once it is built
+class TitleIndex:
+    def __init__(self, tasks=()):
+        # Trigram -> tasks with that trigram in their title
+        self.grams = {}
+
+        # Sorted (word, task id) pairs and the tasks by id, for prefixes shorter than a trigram
+        self.words = []
+        self.tasks = {}
+
+        # Titles the tasks were indexed with, to take them out again after a rename
+        self.titles = {}
+
+        # Words are sorted once when the index is built
+        for task in tasks:
+            self.add(task, sort=False)
+        self.words.sort()
+
+    def add(self, task, sort=True):
+        title = task.title
+        text = title.casefold()
+        for gram in trigrams(text):
+            self.grams.setdefault(gram, set()).add(task)
+        self.tasks[id(task)] = task
+        self.titles[id(task)] = title
+        for word in set(text.split()):
+            if sort:
+                bisect.insort(self.words, (word, id(task)))
+            else:
+                self.words.append((word, id(task)))
+
+    def remove(self, task):
+        text = self.titles.pop(id(task)).casefold()
+        for gram in trigrams(text):
+            tasks = self.grams[gram]
+            tasks.discard(task)
+            if not tasks:
+                del self.grams[gram]
+        del self.tasks[id(task)]
+        for word in set(text.split()):
+            del self.words[bisect.bisect_left(self.words, (word, id(task)))]
+
+    def rename(self, task):
+        self.remove(task)
+        self.add(task)
+
+    def estimate(self, query):
+        # Cheap upper bound of the number of matches
+        query = query.casefold()
+        if len(query) < GRAM:
+            return bisect.bisect_left(self.words, (query + LAST,)) - bisect.bisect_left(self.words, (query,))
+        return min(len(self.grams.get(gram, ())) for gram in trigrams(query))
+
+    def find(self, query):
+        # Tasks whose title contains the query, or for short queries has a word starting with it
+        query = query.casefold()
+        if len(query) < GRAM:
+            found = set()
+            for i in range(bisect.bisect_left(self.words, (query,)), len(self.words)):
+                word, key = self.words[i]
+                if not word.startswith(query):
+                    break
+                found.add(self.tasks[key])
+            return found
+
+        # Every trigram must be there, starting with the rarest, then the titles are checked for the whole query
+        sets = sorted((self.grams.get(gram, set()) for gram in trigrams(query)), key=len)
+        found = sets[0].intersection(*sets[1:])
+        if len(query) > GRAM:
+            found = {task for task in found if query in task.title.casefold()}
+        return found
+
+
+def matches(query, title):
+    # What find() looks for, for a single title
+    query = query.casefold()
+    title = title.casefold()
+    if len(query) < GRAM:
+        return any(word.startswith(query) for word in title.split())
+    return query in title
+
+
+def trigrams(text):
+    return {text[i : i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+# Stands in for the index while a worker thread builds it, edits made meanwhile are applied to it once it is done
+class PendingIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.edits = []
+        self.index = None
+
+    def add(self, task):
+        self.edit("add", task)
+
+    def remove(self, task):
+        self.edit("remove", task)
+
+    def rename(self, task):
+        self.edit("rename", task)
+
+    def edit(self, name, task):
+        # Edits from a prompt can still come here after the index was put in place
+        with self.lock:
+            if self.index is None:
+                self.edits.append((name, task))
+            else:
+                getattr(self.index, name)(task)
+
+    def finish(self, index):
+        with self.lock:
+            for name, task in self.edits:
+                getattr(index, name)(task)
+            self.edits = []
+            self.index = index
+        return index
+
+
+def build_index(project):
+    # The project keeps a pending index up to date while the worker thread reads the titles
+    pending = project.search_index = PendingIndex()
+    tasks = list(project.tasks)
+    return lambda: pending.finish(TitleIndex(tasks))
+
+
+def title_index(project):
+    # None while the index is being built, searches scan the titles meanwhile
+    if project.search_index is None:
+        project.search_index = TitleIndex(project.tasks)
+    index = project.search_index
+    return index if isinstance(index, TitleIndex) else None
+
+
+def rows(project, tasks):
+    # Rows of the tasks in order, project tasks are found through the analysis the frame already made
+    index = project.analyse().index
+    if index is None:
+        return sorted(task.row for task in tasks)
+    return sorted(index[task] for task in tasks)
+
+
+def scan(project, query, start, step):
+    # Nearest matching row from start on in the direction of step, wrapping around, None when there is none
+    tasks = project.tasks
+    count = len(tasks)
+    for i in range(start, start + step * count, step):
+        if matches(query, tasks[i % count].title):
+            return i % count
+    return None
@@ -0,0 +1,358 @@
+import array
+import datetime
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import uuid
+
+from gantty.arrays import ArrayProject, LazyStrings, np
+from gantty.gantt import Analysis, Project
+from gantty.journal import Journal
+
+FORMAT = "gantty"
+VERSION = 2
+
+# First byte of a pickle, files saved before the project format
+PICKLE_MAGIC = b"\x80"
+
+# Version 2 files start with the magic and the offset and length of the JSON header, stored at the end
+MAGIC = b"GANTTY\x00\x02"
+POINTER = struct.Struct("<QQ")
+
+# Number columns of version 2 files and their little endian types, deps are CSR encoded
+NUMBER_COLUMNS = (
+    ("length", "<i4"),
+    ("earliest_start", "<i4"),
+    ("done", "|u1"),
+    ("dep_ptr", "<i8"),
+    ("dep_idx", "<i4"),
+)
+STRING_COLUMNS = ("titles", "descriptions")
+
+# Computed schedule, saved with the columns it was computed from, so that opening a file needs no scheduling
+ANALYSIS_COLUMNS = (
+    ("start", "<i8"),
+    ("end", "<i8"),
+    ("extra", "<i8"),
+    ("slack", "<i8"),
+    ("status", "|i1"),
+)
+
+TYPECODES = {"<i4": "i", "<i8": "q", "|u1": "B", "|i1": "b"}
+
+# Rows between progress reports while writing
+PROGRESS_ROWS = 4096
+
+
+# Version 2 files are columns, each string column has an offset table so that rows can be read on their own
+def save(file_name, project, settings=None):
+    # Returns the id of the snapshot, journals written on top of it refer to it
+    header, columns = snapshot(project, settings)
+    write_snapshot(file_name, header, columns)
+    return header["id"]
+
+
+def snapshot(project, settings=None):
+    # Plain copy of the project, it can be written while the project keeps changing
+    header = {
+        "format": FORMAT,
+        "version": VERSION,
+        "id": uuid.uuid4().hex,
+        "name": project.name,
+        "start_date": project.start_date.isoformat(),
+        "tasks": len(project.tasks),
+        "settings": settings or {},
+    }
+
+    # The interface keeps the analysis up to date, so this is normally a cached value
+    analysis = project.analyse()
+    header["project_end"] = analysis.project_end
+    columns = {name: copy_numbers(getattr(analysis, name), dtype) for name, dtype in ANALYSIS_COLUMNS}
+
+    if isinstance(project, ArrayProject):
+        # Strings of a mapped file are read without keeping them decoded
+        size = len(project.titles)
+        titles, descriptions = project.titles, project.descriptions
+        if isinstance(titles, LazyStrings):
+            titles = [titles.read(row) for row in range(size)]
+        else:
+            titles = list(titles)
+        if isinstance(descriptions, LazyStrings):
+            descriptions = [descriptions.read(row) for row in range(size)]
+        else:
+            descriptions = [descriptions.get(row, "") for row in range(size)]
+        columns.update(
+            length=project.length.copy(),
+            earliest_start=project.earliest_start.copy(),
+            done=project.done.copy(),
+            dep_ptr=project.dep_ptr.copy(),
+            dep_idx=project.dep_idx.copy(),
+            levels=project.levels().copy(),
+            titles=titles,
+            descriptions=descriptions,
+        )
+        return header, columns
+
+    index = {task: i for i, task in enumerate(project.tasks)}
+    columns.update((name, array.array(TYPECODES[dtype])) for name, dtype in NUMBER_COLUMNS)
+    columns["dep_ptr"].append(0)
+    for task in project.tasks:
+        columns["length"].append(task.length)
+        columns["earliest_start"].append(task.earliest_start)
+        columns["done"].append(task.is_done)
+        columns["dep_idx"].extend(index[dep] for dep in task.deps)
+        columns["dep_ptr"].append(len(columns["dep_idx"]))
+    columns["titles"] = [task.title for task in project.tasks]
+    columns["descriptions"] = [task.description for task in project.tasks]
+    return header, columns
+
+
+def write_snapshot(file_name, header, columns, progress=None):
+    # Written next to the file and renamed over it, a crash leaves either the old or the new file
+    temp_name = file_name + ".tmp"
+    with open(temp_name, "wb") as stream:
+        write_binary(stream, header, columns, progress)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(temp_name, file_name)
+    sync_directory(file_name)
+
+
+def write_binary(stream, header, columns, progress=None):
+    stream.write(MAGIC + POINTER.pack(0, 0))
+    sections = {}
+    for name, dtype in NUMBER_COLUMNS + ANALYSIS_COLUMNS + (("levels", "<i4"),):
+        if name in columns:
+            sections[name] = write_numbers(stream, columns[name], dtype)
+    for i, name in enumerate(STRING_COLUMNS):
+        sections[name], sections[name + "_offsets"] = write_strings(stream, columns[name], progress, i)
+
+    data = json.dumps(dict(header, sections=sections)).encode()
+    offset = stream.tell()
+    stream.write(data)
+    stream.seek(len(MAGIC))
+    stream.write(POINTER.pack(offset, len(data)))
+
+
+def write_numbers(stream, values, dtype):
+    # Sections start 8 byte aligned, so that they can be used in place
+    stream.write(bytes(-stream.tell() % 8))
+    offset = stream.tell()
+    if np is not None and isinstance(values, np.ndarray):
+        data = values.astype(dtype).tobytes()
+    else:
+        values = array.array(TYPECODES[dtype], values)
+        if sys.byteorder == "big":
+            values.byteswap()
+        data = values.tobytes()
+    stream.write(data)
+    return [offset, dtype, len(values)]
+
+
+def copy_numbers(values, dtype):
+    if np is not None and isinstance(values, np.ndarray):
+        return values.copy()
+    return array.array(TYPECODES[dtype], values)
+
+
+def write_strings(stream, texts, progress=None, part=0):
+    offset = stream.tell()
+    offsets = array.array("q", [0])
+    for i, text in enumerate(texts):
+        if progress is not None and not i % PROGRESS_ROWS:
+            progress((part + i / len(texts)) / len(STRING_COLUMNS))
+        data = text.encode()
+        stream.write(data)
+        offsets.append(offsets[-1] + len(data))
+    return [offset, "bytes", offsets[-1]], write_numbers(stream, offsets, "<i8")
+
+
+def sync_directory(file_name):
+    # Makes the rename itself durable, where directories can be opened
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def load(file_name, arrays=False):
+    # Returns the project and the view settings saved with it, version 2 files open as an ArrayProject on request
+    with open(file_name, "rb") as stream:
+        start = stream.read(len(MAGIC))
+        if start[:1] == PICKLE_MAGIC:
+            stream.seek(0)
+            return read_pickle(stream)
+    if start == MAGIC:
+        return read_binary(file_name, arrays)
+    with open(file_name, encoding="utf-8") as stream:
+        return read_project(stream)
+
+
+def load_project(file_name, repair=False, arrays=False):
+    # The project with the edits of its journal, the files are only changed when repairing
+    try:
+        project, settings = load(file_name, arrays)
+        header = read_header(file_name)
+        journal = Journal(file_name, header and header.get("id"))
+        journal.replay(project, repair)
+    except (FileNotFoundError, EOFError) as error:
+        raise IOError(f"Could not open {file_name}: {error}")
+    except (ValueError, KeyError, IndexError, TypeError, pickle.UnpicklingError):
+        raise IOError(f"Could not read {file_name} correctly!")
+    return project, settings, journal
+
+
+def read_header(file_name):
+    # Header of a project file, None for old pickled files
+    with open(file_name, "rb") as stream:
+        start = stream.read(len(MAGIC) + POINTER.size)
+        if start[: len(MAGIC)] == MAGIC:
+            offset, length = POINTER.unpack(start[len(MAGIC) :])
+            stream.seek(offset)
+            return json.loads(stream.read(length))
+        stream.seek(0)
+        line = stream.readline()
+    if line[:1] == PICKLE_MAGIC or not line.strip():
+        return None
+    return json.loads(line)
+
+
+def read_binary(file_name, arrays=False):
+    # The file is mapped, number columns are read at once and, for an ArrayProject, strings when a row is first shown
+    with open(file_name, "rb") as stream:
+        data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    offset, length = POINTER.unpack_from(data, len(MAGIC))
+    header = json.loads(data[offset : offset + length])
+    if header.get("format") != FORMAT:
+        raise ValueError("Not a project file")
+    if header["version"] > VERSION:
+        raise ValueError(f"Project format version {header['version']} is newer than this version of gantty")
+
+    sections = header["sections"]
+    columns = {name: read_numbers(data, *sections[name]) for name, _ in NUMBER_COLUMNS}
+    strings = {name: (sections[name][0], read_numbers(data, *sections[name + "_offsets"])) for name in STRING_COLUMNS}
+    start_date = datetime.date.fromisoformat(header["start_date"])
+
+    # Otherwise the tasks are built right away, descriptions are still read on demand
+    if not arrays or np is None:
+        return read_tasks(header, start_date, data, columns, strings), header.get("settings", {})
+
+    analysis = None
+    if all(name in sections for name, _ in ANALYSIS_COLUMNS):
+        analysis = Analysis(
+            *(np.array(read_numbers(data, *sections[name])) for name, _ in ANALYSIS_COLUMNS), header["project_end"]
+        )
+    project = ArrayProject.from_columns(
+        header["name"],
+        start_date,
+        lazy_strings(data, *strings["titles"], intern=True),
+        columns["length"],
+        columns["earliest_start"],
+        columns["done"],
+        columns["dep_ptr"],
+        columns["dep_idx"],
+        read_numbers(data, *sections["levels"]) if "levels" in sections else None,
+        analysis,
+    )
+    project.descriptions = lazy_strings(data, *strings["descriptions"])
+    return project, header.get("settings", {})
+
+
+def read_numbers(data, offset, dtype, count):
+    if np is not None:
+        return np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+    values = array.array(TYPECODES[dtype])
+    values.frombytes(data[offset : offset + count * values.itemsize])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def lazy_strings(data, base, offsets, intern=False):
+    return LazyStrings(data, offsets[:-1] + base, offsets[1:] + base, intern)
+
+
+def read_tasks(header, start_date, data, columns, strings):
+    # Plain ints, the columns can be numpy arrays
+    columns = {name: values.tolist() for name, values in columns.items()}
+    project = Project(header["name"])
+    project.start_date = start_date
+    base, offsets = strings["titles"]
+    for row in range(header["tasks"]):
+        title = data[base + offsets[row] : base + offsets[row + 1]].decode()
+        project.add_task(title, columns["length"][row], columns["earliest_start"][row], bool(columns["done"][row]))
+
+    base, offsets = strings["descriptions"]
+    for row, task in enumerate(project.tasks):
+        start, end = base + offsets[row], base + offsets[row + 1]
+        if end > start:
+            project.descriptions.defer(task, lambda start=start, end=end: data[start:end].decode())
+
+    tasks = project.tasks
+    dep_ptr, dep_idx = columns["dep_ptr"], columns["dep_idx"]
+    project.bulk_link(
+        (tasks[row], tasks[dep_idx[i]]) for row in range(len(tasks)) for i in range(dep_ptr[row], dep_ptr[row + 1])
+    )
+    return project
+
+
+def read_project(stream):
+    # Version 1 files are JSON lines, a header and then one row per task
+    line = stream.readline()
+    if not line.strip():
+        raise EOFError("Empty project file")
+    header = json.loads(line)
+    if header.get("format") != FORMAT:
+        raise ValueError("Not a project file")
+    if header["version"] > 1:
+        raise ValueError(f"Project format version {header['version']} is not a text file")
+
+    project = Project(header["name"])
+    project.start_date = datetime.date.fromisoformat(header["start_date"])
+
+    # Deps can point forward, the edges are linked once every task exists
+    columns = header["columns"]
+    edges = []
+    for i, line in enumerate(stream):
+        row = dict(zip(columns, json.loads(line)))
+        task = project.add_task(row["title"], row["length"], row["earliest_start"], row["is_done"])
+        if row.get("description"):
+            project.descriptions.set(task, row["description"])
+        edges.extend((i, dep) for dep in row["deps"])
+
+    tasks = project.tasks
+    project.bulk_link((tasks[i], tasks[dep]) for i, dep in edges)
+    return project, header.get("settings", {})
+
+
+def read_pickle(stream):
+    # Files from before the project format hold a whole pickled View
+    view = pickle.load(stream)
+    if not hasattr(view, "project"):
+        raise TypeError("Could not read file correctly!")
+    return view.project, view.settings()
+
+
+def convert(source, target):
+    project, settings = load(source)
+    save(target, project, settings)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("USAGE: python -m gantty.storage <old file> <new file>")
+        exit()
+    convert(sys.argv[1], sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
+import bisect
 import datetime
 import os
-import pickle
 import subprocess
 import sys
 import tempfile
 import termios
 import tty
 
+from gantty import instrument, storage
 from gantty.gantt import Project, Status, Task
+from gantty.history import History
+from gantty.journal import apply_record
 from gantty.keys import Keybindings
+from gantty.screen import Screen, clip, text_width
+from gantty.search import SORTED, rows, scan, title_index
 
 
 # Colors
@@ -35,6 +40,11 @@ class Color:
 class Constants:
     DAY = 0
     WEEK = 1
+    MONTH = 2
+    QUARTER = 3
+
+    # Zoom levels in the order the view toggle goes through them
+    ZOOMS = (DAY, WEEK, MONTH, QUARTER)
 
     TASK_BG_COLOR = Color.default
 
@@ -71,12 +81,44 @@ class Constants:
     INFO_BG_COLOR = Color.yellow
     INFO_FG_COLOR = Color.black
 
+    LABEL_CACHE_SIZE = 4096
+
+    # The journal is folded into the project file once it passes half its size, or this
+    JOURNAL_MIN_BYTES = 64 * 1024
+
     DEFAULT_TASK_WIDTH = 32
     TASK_Y_OFFSET = 4
 
 
+# Dependency sets of the task whose dependencies are being selected
+class DepSets:
+    def __init__(self, task):
+        project = task.project
+        self.task = task
+        self.revision = project.revision
+        self.deps = set(task.deps)
+        self.dependents = set(task.dependents)
+        self.ancestors = set(project.ancestors(task))
+        self.descendants = set(project.descendants(task))
+
+
+# Incremental title search, the cursor follows the first match from where the search started
+class Search:
+    def __init__(self, view):
+        self.query = ""
+        self.origin = view.current_task, view.first_task
+        # Sorted matching rows, None when there are too many to sort on every key
+        self.matches = []
+        self.match = 0
+
+
 # Project view
 class View:
+    _dep_sets = None
+    journal = None
+    profiling = False
+    search = None
+
     def __init__(self, project):
         self.project = project
         self.view = Constants.DAY
@@ -92,12 +134,34 @@ class View:
         self.current_task = 0
         self.inputting_title = False
 
+        # Keys typed right after a prompt key, the prompt reads them before the terminal
+        self.typed_ahead = []
+
         # Size
         self.update_size()
 
         # Defaults
         self.task_width = Constants.DEFAULT_TASK_WIDTH
 
+        # Undo and redo steps
+        self.history = History()
+
+    # View preferences saved along with the project
+    def settings(self):
+        return {"zoom": self.view, "column_width": self.column_width, "task_width": self.task_width}
+
+    def restore(self, settings):
+        self.view = settings.get("zoom", self.view)
+        self.column_width = settings.get("column_width", self.column_width)
+        self.task_width = settings.get("task_width", self.task_width)
+
+    @property
+    def dep_sets(self):
+        sets = self._dep_sets
+        if sets is None or sets.task is not self.deps_for or sets.revision != self.project.revision:
+            sets = self._dep_sets = DepSets(self.deps_for)
+        return sets
+
     @property
     def first_date(self):
         delta = datetime.timedelta(days=self.first_date_offset)
@@ -107,46 +171,173 @@ class View:
     def current(self):
         return self.project.tasks[self.current_task]
 
+    @property
+    def visible_tasks(self):
+        return (self.height - Constants.TASK_Y_OFFSET + 1) // 2
+
     def update_size(self):
-        rows, columns = os.popen("stty size", "r").read().split()
-        self.height = int(rows)
-        self.width = int(columns)
+        self.width, self.height = terminal_size()
+
+    def column_date(self, i):
+        # First day of the i-th column from the first visible one
+        date = self.first_date
+        if self.view == Constants.DAY:
+            return date + datetime.timedelta(days=i)
+        if self.view == Constants.WEEK:
+            return date + datetime.timedelta(days=7 * i)
+
+        # Month and quarter columns follow the calendar
+        months = 1 if self.view == Constants.MONTH else 3
+        first = datetime.date(date.year, date.month - (date.month - 1) % months, 1)
+        return add_months(first, i * months)
 
     def toggle_view(self):
-        self.view = Constants.DAY if self.view == Constants.WEEK else Constants.WEEK
+        zooms = Constants.ZOOMS
+        self.view = zooms[(zooms.index(self.view) + 1) % len(zooms)]
+
+    def toggle_profile(self):
+        self.profiling = not self.profiling
+        instrument.enable(self.profiling)
+
+    # Movements take a count, so that repeated keys are applied at once
 
-    def pan_left(self):
-        self.first_date_offset -= 1 if self.view == Constants.DAY else 7
+    def pan_left(self, count=1):
+        self.first_date_offset = (self.column_date(-count) - self.project.start_date).days
         if self.first_date_offset < 0:
             self.first_date_offset = 0
 
-    def pan_right(self):
-        self.first_date_offset += 1 if self.view == Constants.DAY else 7
+    def pan_right(self, count=1):
+        self.first_date_offset = (self.column_date(count) - self.project.start_date).days
 
-    def pan_up(self):
+    def pan_up(self, count=1):
         if self.first_task > 0:
-            self.first_task -= 1
+            self.first_task = max(self.first_task - count, 0)
 
-    def pan_down(self):
-        if self.first_task < len(self.project.tasks) - ((self.height - Constants.TASK_Y_OFFSET + 1) // 2):
-            self.first_task += 1
+    def pan_down(self, count=1):
+        last = len(self.project.tasks) - self.visible_tasks
+        if self.first_task < last:
+            self.first_task = min(self.first_task + count, last)
 
-    def select_up(self):
+    def select_up(self, count=1):
         if self.current_task > 0:
-            self.current_task -= 1
-
-    def select_down(self):
-        if self.current_task < len(self.project.tasks) - 1:
-            self.current_task += 1
+            self.current_task = max(self.current_task - count, 0)
+
+    def select_down(self, count=1):
+        last = len(self.project.tasks) - 1
+        if self.current_task < last:
+            self.current_task = min(self.current_task + count, last)
+
+    def show_task(self, i):
+        # Scrolls only when the task is off screen, then puts it in the middle
+        self.current_task = i
+        if not self.first_task <= i < self.first_task + self.visible_tasks:
+            last = max(len(self.project.tasks) - self.visible_tasks, 0)
+            self.first_task = min(max(i - self.visible_tasks // 2, 0), last)
+
+    # Search
+
+    def start_search(self):
+        self.search = Search(self)
+
+    def search_key(self, char, count=1):
+        search = self.search
+        if char in Keybindings.SEARCH_ACCEPT:
+            self.search = None
+        elif char == Keybindings.SEARCH_CANCEL:
+            self.current_task, self.first_task = search.origin
+            self.search = None
+        elif char in Keybindings.SEARCH_NEXT:
+            self.next_match(count)
+        elif char in Keybindings.SEARCH_PREVIOUS:
+            self.next_match(-count)
+        elif char in Keybindings.SEARCH_BACKSPACE:
+            search.query = search.query[:-count]
+            self.find()
+        elif char.isprintable():
+            search.query += char * count
+            self.find()
+
+    def find(self):
+        # Broad queries, and all of them while the index is built, only look for the nearest match
+        search = self.search
+        search.matches = []
+        if search.query:
+            index = title_index(self.project)
+            if index is not None and index.estimate(search.query) <= SORTED:
+                search.matches = rows(self.project, index.find(search.query))
+            else:
+                row = scan(self.project, search.query, search.origin[0], 1)
+                if row is not None:
+                    search.matches = None
+                    self.show_task(row)
+                    return
+        if not search.matches:
+            self.current_task, self.first_task = search.origin
+            return
+        search.match = bisect.bisect_left(search.matches, search.origin[0]) % len(search.matches)
+        self.show_task(search.matches[search.match])
+
+    def next_match(self, step):
+        search = self.search
+        if search.matches is None:
+            direction = 1 if step > 0 else -1
+            for _ in range(abs(step)):
+                self.show_task(scan(self.project, search.query, self.current_task + direction, direction))
+        elif search.matches:
+            search.match = (search.match + step) % len(search.matches)
+            self.show_task(search.matches[search.match])
+
+    # Edits are recorded with the records that revert them, saving appends them to the journal
+
+    def record(self, record, inverse):
+        self.unsaved_edits = True
+        if self.journal is not None:
+            self.journal.record(*record)
+        self.history.push([record], inverse)
+
+    def undo(self):
+        step = self.history.undo()
+        if step is None:
+            return False
+        self.replay(step[1], step[0][0])
+        return True
+
+    def redo(self):
+        step = self.history.redo()
+        if step is None:
+            return False
+        self.replay(step[0], step[0][0])
+        return True
+
+    def replay(self, records, edit):
+        # Applies the records of an undo or redo step and journals them
+        for record in records:
+            apply_record(self.project, record)
+            self.unsaved_edits = True
+            if self.journal is not None:
+                self.journal.record(*record)
+
+        # The cursor goes back to the task that was edited, selecting deps stops if tasks came or went
+        op = edit[0]
+        last = len(self.project.tasks) - 1
+        target = last if op == "add" else edit[2] if op == "dep" else edit[1]
+        self.current_task = max(min(target, last), 0)
+        if op in ("add", "delete"):
+            self.selecting_deps = False
 
     def grow_current(self):
         self.current.length += 1
-        self.unsaved_edits = True
+        self.record(
+            ("length", self.current_task, self.current.length), [("length", self.current_task, self.current.length - 1)]
+        )
 
     def shrink_current(self):
         if self.current.length > 1:
             self.current.length -= 1
-            self.unsaved_edits = True
+            self.record(
+                ("length", self.current_task, self.current.length),
+                [("length", self.current_task, self.current.length + 1)],
+            )
 
     def grow_task_title(self):
         self.task_width += 1
@@ -156,11 +347,17 @@ class View:
             self.task_width -= 1
 
     def toggle_done_current(self):
-        if self.current.is_done:
-            self.current.set_not_done()
+        # Done goes up to every dep, not done down to the direct dependents
+        row = row_of(self.project)
+        task = self.current
+        if task.is_done:
+            changed = [task] + [dependent for dependent in task.dependents if dependent.is_done]
+            task.set_not_done()
         else:
-            self.current.set_done()
-        self.unsaved_edits = True
+            changed = [other for other in [task, *self.project.ancestors(task)] if not other.is_done]
+            task.set_done()
+        inverse = [("is_done", row(other), not other.is_done) for other in changed]
+        self.record(("done", self.current_task, task.is_done), inverse)
 
     def select_deps(self):
         if self.selecting_deps and self.current is self.deps_for:
@@ -170,63 +367,118 @@ class View:
         self.deps_for = self.current
 
     def toggle_dep(self):
-        self.deps_for.toggle_dep(self.current)
-        self.unsaved_edits = True
+        # A new edge can drop the edges it makes redundant and mark deps done, all of that is reverted
+        row = row_of(self.project)
+        task, dep = self.deps_for, self.current
+        deps, dependents = set(task.deps), set(dep.dependents)
+        undone = [other for other in [dep, *self.project.ancestors(dep)] if not other.is_done] if task.is_done else []
+        task.toggle_dep(dep)
+
+        i, j = row(task), self.current_task
+        inverse = [("unlink", i, j)] if dep in task.deps and dep not in deps else []
+        inverse += [("link", i, row(other)) for other in deps if other not in task.deps]
+        inverse += [
+            ("link", row(other), j) for other in dependents if other is not task and other not in dep.dependents
+        ]
+        inverse += [("is_done", row(other), False) for other in undone if other.is_done]
+        self.record(("dep", i, j), inverse)
 
     def add_task(self, fd, old_settings):
         title = get_input_text(self, "Title: ", fd, old_settings)
         if title:
             self.project.add_task(title)
             self.current_task = len(self.project.tasks) - 1
-            self.unsaved_edits = True
+            self.record(("add", title), [("delete", self.current_task)])
 
     def rename_current(self, fd, old_settings):
         title = get_input_text(self, "New title: ", fd, old_settings)
         if title:
+            old_title = self.current.title
             self.current.title = title
-            self.unsaved_edits = True
+            self.record(("title", self.current_task, title), [("title", self.current_task, old_title)])
 
     def delete_current(self, fd, old_settings):
         confirm = get_input_text(self, "About to delete a task! Are you sure you want to continue? ", fd, old_settings)
         if confirm.lower() == "yes":
-            self.project.remove_task(self.current)
+            self.delete(self.current_task)
             self.current_task -= 1
 
+    def delete(self, i):
+        # The deps of the task are spliced into its dependents, undo takes those edges out and puts the task back
+        task = self.project.tasks[i]
+        row = row_of(self.project)
+        deps, dependents = list(task.deps), list(task.dependents)
+        rows = {other: row(other) for other in deps + dependents}
+        links = [("link", i, rows[dep]) for dep in deps] + [("link", rows[other], i) for other in dependents]
+        before = {other: set(other.deps) for other in dependents}
+        insert = ("insert", i, task.title, task.length, task.earliest_start, task.is_done, task.description)
+
+        # Rows after the removed one move up
+        self.project.remove_task(task)
+        rows = {other: r - (r > i) for other, r in rows.items()}
+        spliced = [
+            ("unlink", rows[other], rows[dep]) for other in dependents for dep in other.deps if dep not in before[other]
+        ]
+        if self.selecting_deps and task is self.deps_for:
+            self.selecting_deps = False
+        self.record(("delete", i), spliced + [insert] + links)
+
     def edit_current(self):
         initial_msg = self.current.description
         if not initial_msg:
             initial_msg = f"== {self.current.title}"
+        old_description = self.current.description
+
+        # Keys typed ahead were meant for the editor, which cannot be given them
+        self.typed_ahead = []
         self.current.description = get_editor_input(initial_msg)
-        self.unsaved_edits = True
+        self.record(
+            ("description", self.current_task, self.current.description),
+            [("description", self.current_task, old_description)],
+        )
+
+
+def row_of(project):
+    # Row of a task, projects look it up in the analysis the last frame already made
+    index = project.analyse().index
+    return (lambda task: task.row) if index is None else index.__getitem__
+
+
+# Every frame is drawn into the screen buffer, then only the changes are sent to the terminal
+screen = Screen()
 
 
 # Writting and cursor
 def write(text):
-    sys.stdout.write(text)
+    screen.write(text)
+
+
+def emit(text):
+    screen.emit(text)
 
 
 def clear():
-    write("\x1b[2J\x1b[1;1H")
+    screen.clear()
 
 
 def goto(x, y):
-    write(f"\x1b[{y + 1};{x + 1}H")
+    screen.move(x, y)
 
 
 def goleft(n):
-    write(f"\x1b[{n}D")
+    screen.move(screen.x - n, screen.y)
 
 
 def goright(n):
-    write(f"\x1b[{n}C")
+    screen.move(screen.x + n, screen.y)
 
 
 def goup(n):
-    write(f"\x1b[{n}A")
+    screen.move(screen.x, screen.y - n)
 
 
 def godown(n):
-    write(f"\x1b[{n}B")
+    screen.move(screen.x, screen.y + n)
 
 
 # Formating
@@ -241,139 +493,256 @@ def get_fg(fg):
 
 
 def set_bg(bg):
-    bg = get_bg(bg)
-    write(bg)
-    return bg
+    screen.bg = bg
+    return get_bg(bg)
 
 
 def set_fg(fg):
-    fg = get_fg(fg)
-    write(fg)
-    return fg
+    screen.fg = fg
+    return get_fg(fg)
 
 
 def reset():
-    write("\x1b[39;49m")
+    screen.fg = screen.bg = Color.default
 
 
-def get_task_color(view, task):
+def get_task_color(view, task, status=None):
     if view.selecting_deps:
+        dep_sets = view.dep_sets
         if task is view.deps_for:
             return Constants.DEPS_OF_COLOR
-        if task in view.deps_for.deps:
+        if task in dep_sets.deps:
             return Constants.DIRECT_DEPENDENCY_COLOR
-        if task in view.deps_for.dependents:
+        if task in dep_sets.dependents:
             return Constants.DIRECT_DEPENDENT_COLOR
-        if view.deps_for.has_dep(task):
+        if task in dep_sets.ancestors:
             return Constants.DEPENDENCY_COLOR
-        if view.deps_for.has_dependent(task):
+        if task in dep_sets.descendants:
             return Constants.DEPENDENT_COLOR
         return Constants.DEFAULT_COLOR
-    if task.status == Status.DONE:
+    if status is None:
+        status = task.status
+    if status == Status.DONE:
         return Constants.DONE_COLOR
-    if task.status == Status.ONGOING:
+    if status == Status.ONGOING:
         return Constants.ONGOING_COLOR
-    if task.status == Status.CRITICAL:
+    if status == Status.CRITICAL:
         return Constants.CRITICAL_COLOR
     return Constants.DEFAULT_COLOR
 
 
 # UI
-def draw_date(view, date, is_last=False):
-    day = "       "
+def add_months(date, months):
+    months += date.month - 1
+    return datetime.date(date.year + months // 12, months % 12 + 1, 1)
+
+
+def center(text, width):
+    if not len(text) % 2:
+        text += " "
+    while len(text) < width:
+        text = " " + text + " "
+    return text
+
+
+# Mapping between days and grid columns for the current zoom level
+class Timeline:
+    def __init__(self, view):
+        self.column_width = view.column_width
+        self.columns = max(0, (view.width - view.task_width) // view.column_width)
+        self.width = view.width - view.task_width
+
+        # Column boundaries as days since the project start, one more column than fits for the partial one
+        self.dates = [view.column_date(i) for i in range(self.columns + 2)]
+        self.days = [(date - view.project.start_date).days for date in self.dates]
+
+    def x(self, day):
+        # Grid x of a day since the project start, the days before and after the columns are extrapolated
+        days = self.days
+        i = min(max(bisect.bisect_right(days, day) - 1, 0), len(days) - 2)
+        return int(i * self.column_width + (day - days[i]) * self.column_width // (days[i + 1] - days[i]))
+
+    def day(self, x):
+        # Day since the project start at which grid x begins
+        days = self.days
+        i = min(max(x // self.column_width, 0), len(days) - 2)
+        return days[i] + (x - i * self.column_width) * (days[i + 1] - days[i]) / self.column_width
+
+
+def date_labels(view, date):
     if view.view == Constants.DAY:
-        day = date.strftime("%a")
-        if not len(day) % 2:
-            day += " "
-        while len(day) < 7:
-            day = " " + day + " "
-    write(day)
-    godown(1)
-    goleft(6 if is_last else 7)
-    write(date.strftime(" %d/%m "))
-    goup(1)
-
-
-def draw_grid(view):
-    date = view.first_date
-    delta = datetime.timedelta(days=1 if view.view == Constants.DAY else 7)
+        return center(date.strftime("%a"), view.column_width), date.strftime(" %d/%m ")
+    if view.view == Constants.WEEK:
+        return " " * view.column_width, date.strftime(" %d/%m ")
+    if view.view == Constants.MONTH:
+        return center(date.strftime("%b"), view.column_width), center(date.strftime("%Y"), view.column_width)
+    return center(f"Q{(date.month - 1) // 3 + 1}", view.column_width), center(date.strftime("%Y"), view.column_width)
+
+
+def draw_date(view, date, x, labels=None):
+    key = view.view, view.column_width, date
+    if labels is None:
+        top, bottom = date_labels(view, date)
+    elif key in labels:
+        top, bottom = labels[key]
+    else:
+        if len(labels) >= Constants.LABEL_CACHE_SIZE:
+            labels.clear()
+        top, bottom = labels[key] = date_labels(view, date)
+    goto(x, 1)
+    write(top)
+    goto(x, 2)
+    write(bottom)
+
+
+def draw_background(view, timeline):
     set_fg(Constants.GRID_FG)
+    row = []
+    current = Constants.GRID_COLOR_A
+    for i in range(timeline.columns):
+        row.append(current)
+        current = Constants.GRID_COLOR_B if current == Constants.GRID_COLOR_A else Constants.GRID_COLOR_A
     for y in range(view.height):
-        goto(view.task_width, y)
-        current = Constants.GRID_COLOR_A
-        set_bg(current)
-        column_count = (view.width - view.task_width) // view.column_width
-        for i in range(column_count):
-            if y == 1:
-                draw_date(view, date, view.task_width + i * 7 == view.width - 7)
-                date += delta
-            elif y != 2:
+        if y not in (1, 2):
+            for i, color in enumerate(row):
+                goto(view.task_width + i * view.column_width, y)
+                set_bg(color)
                 write(" " * view.column_width)
-            current = Constants.GRID_COLOR_B if current == Constants.GRID_COLOR_A else Constants.GRID_COLOR_A
-            set_bg(current)
-
-    # Draw today
-    unit_block = 7 if view.view == Constants.DAY else 1
-    today = datetime.datetime.now()
-    offset = today - datetime.datetime.combine(view.first_date, datetime.datetime.min.time())
-    now = offset.days * unit_block + (offset.seconds * unit_block) // (60 * 60 * 24)
-    if offset.days >= 0 and now <= view.width - view.task_width:
+
+
+def draw_header(view, timeline, labels=None):
+    set_fg(Constants.GRID_FG)
+    current = Constants.GRID_COLOR_A
+    for i in range(timeline.columns):
+        set_bg(current)
+        draw_date(view, timeline.dates[i], view.task_width + i * view.column_width, labels)
+        current = Constants.GRID_COLOR_B if current == Constants.GRID_COLOR_A else Constants.GRID_COLOR_A
+
+
+def draw_today(view, timeline, today):
+    # Returns when the marker next moves
+    start = datetime.datetime.combine(view.project.start_date, datetime.datetime.min.time())
+    offset = today - start
+    now = timeline.x(offset.days + offset.seconds / (60 * 60 * 24))
+    if 0 <= now <= timeline.width:
         goto(view.task_width + now, Constants.TASK_Y_OFFSET)
+        set_fg(Constants.GRID_FG)
         set_bg(Constants.TODAY_COLOR)
         for i in range(view.height - Constants.TASK_Y_OFFSET):
             write(" ")
             godown(1)
             goleft(1)
+    return start + datetime.timedelta(days=timeline.day(now + 1))
+
+
+# Grid and date header, drawn once per viewport and copied into each frame
+class GridCache:
+    def __init__(self):
+        self.key = None
+        self.expires = None
+        self.cells = None
+
+        # Column backgrounds, independent of the dates
+        self.background_key = None
+        self.background = None
+
+        # Column labels by zoom level, column width and date, reused when panning
+        self.labels = {}
+
+    def draw(self, view, timeline):
+        today = datetime.datetime.now()
+        key = view.first_date, view.view, view.column_width, view.task_width, view.width, view.height
+        if key != self.key or today >= self.expires:
+            self.build(view, timeline, today)
+            self.key = key
+        screen.restore(self.cells)
+
+    def build(self, view, timeline, today):
+        background_key = view.column_width, view.task_width, view.width, view.height
+        if background_key != self.background_key:
+            screen.clear()
+            draw_background(view, timeline)
+            reset()
+            self.background = screen.snapshot()
+            self.background_key = background_key
+        else:
+            screen.restore(self.background)
 
-    reset()
+        draw_header(view, timeline, self.labels)
+        self.expires = draw_today(view, timeline, today)
+        reset()
+        self.cells = screen.snapshot()
 
 
-def draw_task(view, i):
-    task = view.project.tasks[i + view.first_task]  #
+grid = GridCache()
+
+
+def draw_grid(view, timeline=None):
+    if timeline is None:
+        timeline = Timeline(view)
+    grid.draw(view, timeline)
+
+
+def draw_task(view, i, analysis=None, timeline=None):
+    if analysis is None:
+        analysis = view.project.analyse()
+    if timeline is None:
+        timeline = Timeline(view)
+    k = i + view.first_task
+    task = view.project.tasks[k]  #
     y = i * 2 + Constants.TASK_Y_OFFSET  #
     if y >= view.height:
         return
 
-    width = view.width - view.task_width
-
     # Draw title
     goto(0, y)
 
+    # Titles are measured in cells, wide characters take two
     task_text = " " + task.title
-    if len(task.title) > view.task_width - 2:
-        task_text = task_text[: view.task_width - 3] + "…"
+    title_width = text_width(task.title)
+    if title_width > view.task_width - 2:
+        task_text = clip(task_text, view.task_width - 3)
+        task_text += " " * (view.task_width - 3 - text_width(task_text)) + "…"
     else:
-        task_text += " " * (view.task_width - len(task.title) - 1)
+        task_text += " " * (view.task_width - title_width - 1)
     if i + view.first_task == view.current_task:  #
         set_bg(Constants.CURRENT_TASK_BG_COLOR)
         set_fg(Constants.CURRENT_TASK_FG_COLOR)
-        task_text += " " * width
+        task_text += " " * timeline.width
 
     write(task_text)
 
-    # Draw block
+    # Draw block, clipped to the grid before anything is allocated
     set_fg(Color.black)
-    set_bg(get_task_color(view, task))
-
-    block_unit = 7 if view.view == Constants.DAY else 1
-    block = " " * task.length * block_unit + "▒" * task.extra * block_unit
-    start = task.start * block_unit - view.first_date_offset * block_unit
-    if start < 0:
-        block = block[-start:]
-        start = 0
-    if start < width:
-        if len(block) + start > width:
-            block = block[: width - start]
+    set_bg(get_task_color(view, task, analysis.status[k]))
 
-        goto(view.task_width + start, y)
-        write(block)
+    start = analysis.start[k]
+    end = start + task.length
+    first = timeline.x(start)
+    middle = max(timeline.x(end), first + 1)  # Short tasks keep a cell when zoomed out
+    last = max(timeline.x(end + analysis.extra[k]), middle)
+    draw_span(view, y, first, middle, " ", timeline.width)
+    draw_span(view, y, middle, last, "▒", timeline.width)
 
     reset()
 
 
-def draw_tasks(view):
-    for i in range(len(view.project.tasks) - view.first_task):
-        draw_task(view, i)
+def draw_span(view, y, first, last, char, width):
+    first = max(first, 0)
+    last = min(last, width)
+    if first < last:
+        goto(view.task_width + first, y)
+        write(char * (last - first))
+
+
+def draw_tasks(view, timeline=None):
+    # One critical path pass per frame, and only the rows that fit on screen
+    analysis = view.project.analyse()
+    if timeline is None:
+        timeline = Timeline(view)
+    last = min(len(view.project.tasks), view.first_task + view.visible_tasks)
+    for i in range(last - view.first_task):
+        draw_task(view, i, analysis, timeline)
 
 
 def draw_info(view, msg=""):
@@ -382,64 +751,131 @@ def draw_info(view, msg=""):
     set_fg(Constants.INFO_FG_COLOR)
     if msg:
         write(f" {msg} ")
+    elif view.search is not None:
+        search = view.search
+        if search.matches is None:
+            found = "many"
+        else:
+            found = (
+                f"{search.match + 1}/{len(search.matches)}" if search.matches else "no match" if search.query else ""
+            )
+        write(f" /{search.query} {found} ")
     elif view.selecting_deps:
         write(f' Selecting dependencies for "{view.deps_for.title}" ')
+
+    # Numbers of the previous frame, on the right of the message
+    if view.profiling:
+        text = f" {instrument.summary()} "[: max(view.width - screen.x, 0)]
+        goto(view.width - len(text), 0)
+        write(text)
     reset()
 
 
 def get_input_text(view, msg, fd, old_settings):
+    # Keys typed ahead start the answer, an Enter among them gives it without waiting for the terminal
+    text = ""
+    while view.typed_ahead:
+        char = view.typed_ahead.pop(0)
+        if char in Keybindings.SEARCH_ACCEPT:
+            return text
+        if char in Keybindings.SEARCH_BACKSPACE:
+            text = text[:-1]
+        elif char.isprintable():
+            text += char
+
     goto(0, 0)
-    set_bg(Constants.PROMPT_BG_COLOR)
-    set_fg(Constants.PROMPT_FG_COLOR)
+    bg = set_bg(Constants.PROMPT_BG_COLOR)
+    fg = set_fg(Constants.PROMPT_FG_COLOR)
     write(" " * view.width)
     goto(1, 0)
-    write(f"{msg}\x1b[?25h")
-    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-    text = input()
+    write(msg)
     reset()
+    screen.present()
+
+    # Typing happens on the terminal itself, after the prompt
+    emit(f"\x1b[1;{len(msg) + 2}H{bg}{fg}\x1b[?25h{text}")
+    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+    text += input()
+    emit("\x1b[39;49m")
     tty.setraw(sys.stdin)
-    write("\x1b[?25l")
+    emit("\x1b[?25l")
+    screen.invalidate()
     return text
 
 
 def get_editor_input(initial_msg):
     editor = os.environ.get("EDITOR", "vim")
-    with tempfile.Named_temporary_file("w+", suffix=".adoc") as tf:
+    with tempfile.NamedTemporaryFile("w+", suffix=".adoc") as tf:
         tf.write(initial_msg)
         tf.flush()
         subprocess.call([editor, tf.name])
-        write("\x1b[?25l")
-        tf.seek(0)
-        return tf.read()
+        emit("\x1b[?25l")
+        screen.invalidate()
+
+        # Editors may save to a new file under the same name
+        with open(tf.name) as edited:
+            return edited.read()
+
+
+def draw(view, msg=""):
+    frame = screen.frame
+    sent, writes = frame.total_bytes, frame.total_writes
 
+    with instrument.Phase("frame"):
+        screen.resize(view.width, view.height)
 
-def draw(view):
+        # Draw the grid, it replaces the whole back buffer
+        timeline = Timeline(view)
+        with instrument.Phase("grid"):
+            draw_grid(view, timeline)
 
-    # Clear
-    clear()
+        with instrument.Phase("tasks"):
+            draw_tasks(view, timeline)
 
-    # Draw the grid
-    draw_grid(view)
+        draw_info(view, msg)
 
-    draw_tasks(view)
+        # Send the changes
+        with instrument.Phase("present"):
+            screen.present()
 
-    draw_info(view)
+    instrument.end_frame(bytes=frame.total_bytes - sent, writes=frame.total_writes - writes)
 
-    # Flush
-    sys.stdout.flush()
 
+def apply_keys(view, keys, _fd, _old_settings, _FILE_NAME):
+    # Runs of the same movement key are applied in one step, returns the last message
+    msg = ""
+    i = 0
+    while i < len(keys):
+        char = keys[i]
+        count = 1
+        if Keybindings.ESCAPE_SEQUENCES.get(char, char) in Keybindings.REPEATABLE:
+            while i + count < len(keys) and keys[i + count] == char:
+                count += 1
+        msg = apply(view, char, _fd, _old_settings, _FILE_NAME, count)
+        i += count
+    return msg
 
-def process(view, char, _fd, _old_settings, _FILE_NAME):
 
-    redraw = True
+def apply(view, char, _fd, _old_settings, _FILE_NAME, count=1):
+    # Returns the message to show in the info bar
+
+    msg = ""
+
+    # Keys typed while searching are the query
+    if view.search is not None:
+        view.search_key(char, count)
+        return msg
+    char = Keybindings.ESCAPE_SEQUENCES.get(char, char)
 
     if len(view.project.tasks):
 
         # Needs at least 1 task
-        if char == Keybindings.SELECT_UP:
-            view.select_up()
+        if char == Keybindings.SEARCH:
+            view.start_search()
+        elif char == Keybindings.SELECT_UP:
+            view.select_up(count)
         elif char == Keybindings.SELECT_DOWN:
-            view.select_down()
+            view.select_down(count)
 
         elif char == Keybindings.GROW_TASK:
             view.grow_current()
@@ -467,13 +903,13 @@ def process(view, char, _fd, _old_settings, _FILE_NAME):
         view.toggle_view()
 
     elif char == Keybindings.PAN_RIGHT:
-        view.pan_right()
+        view.pan_right(count)
     elif char == Keybindings.PAN_LEFT:
-        view.pan_left()
+        view.pan_left(count)
     elif char == Keybindings.PAN_UP:
-        view.pan_up()
+        view.pan_up(count)
     elif char == Keybindings.PAN_DOWN:
-        view.pan_down()
+        view.pan_down(count)
 
     elif char == Keybindings.PAN_TOP:
         view.first_task = 0
@@ -493,29 +929,86 @@ def process(view, char, _fd, _old_settings, _FILE_NAME):
         view.add_task(_fd, _old_settings)
 
     elif char == Keybindings.WRITE_TO_FILE:
-        with open(_FILE_NAME, "wb") as gantt_file:
-            pickle.dump(view, gantt_file)
-        view.unsaved_edits = False
-        draw_info(view, "Project saved!")
-        sys.stdout.flush()
-        redraw = False
+        save(view, _FILE_NAME)
+        msg = "Project saved!"
+
+    elif char == Keybindings.TOGGLE_PROFILE:
+        view.toggle_profile()
+
+    elif char == Keybindings.UNDO:
+        msg = "" if view.undo() else "Nothing to undo"
+    elif char == Keybindings.REDO:
+        msg = "" if view.redo() else "Nothing to redo"
 
     else:
         pass
 
-    if redraw:
-        draw(view)
+    return msg
+
+
+def terminal_size():
+    # Asks the terminal driver directly, without a subprocess
+    for stream in (sys.stdout, sys.stdin):
+        try:
+            return os.get_terminal_size(stream.fileno())
+        except (OSError, ValueError):
+            pass
+    return os.terminal_size((80, 24))
+
+
+def save(view, file_name):
+    job = SaveJob(view, file_name)
+    job.run()
+    job.finish()
+
+
+# A save prepared on the UI thread, run() can go to a worker thread, finish() or fail() come back
+class SaveJob:
+    def __init__(self, view, file_name, progress=None):
+        self.view = view
+        self.file_name = file_name
+        self.progress = progress
+
+        # Edits go to the journal, the whole project is written when the journal grows too big
+        journal = view.journal
+        self.compact = journal is None or journal.snapshot is None or journal.bytes > compact_size(file_name)
+        if self.compact:
+            self.header, self.columns = storage.snapshot(view.project, view.settings())
+            self.done = len(journal.pending) if journal is not None else None
+        else:
+            self.records = journal.take()
+        view.unsaved_edits = False
+
+    def run(self):
+        if self.compact:
+            storage.write_snapshot(self.file_name, self.header, self.columns, self.progress)
+        else:
+            self.view.journal.write(self.records)
+
+    def finish(self):
+        if self.compact and self.view.journal is not None:
+            self.view.journal.reset(self.header["id"], self.done)
+
+    def fail(self):
+        if not self.compact:
+            self.view.journal.pending[:0] = self.records
+        self.view.unsaved_edits = True
+
+
+def compact_size(file_name):
+    try:
+        return max(Constants.JOURNAL_MIN_BYTES, os.path.getsize(file_name) // 2)
+    except FileNotFoundError:
+        return 0
 
 
 def on_resize(view):
     view.update_size()
 
     # Fix scrolling
-    view.first_task = min(view.first_task, len(view.project.tasks) - ((view.height - Constants.TASK_Y_OFFSET + 1) // 2))
+    view.first_task = min(view.first_task, len(view.project.tasks) - view.visible_tasks)
     if view.first_task < 0:
         view.first_task = 0
 
-    draw(view)
-
 
 # ╭╮╰╯─│→├▐█▌┤
@@ -0,0 +1,34 @@
+import random
+
+from gantty.gantt import Project
+
+
+def random_project(seed, count=40):
+    # Deps picked among recent tasks, with some done tasks and descriptions
+    rng = random.Random(seed)
+    project = Project(f"Random {seed}")
+    for i in range(count):
+        task = project.add_task(f"Task {i}", rng.randint(1, 5), rng.randint(0, 3), rng.random() < 0.2)
+        if rng.random() < 0.2:
+            task.description = f"== Task {i}\nnotes"
+    tasks = project.tasks
+    project.bulk_link(
+        (tasks[i], tasks[dep]) for i in range(count) for dep in rng.sample(range(max(0, i - 8), i), min(i, 2))
+    )
+    return project
+
+
+def signature(project):
+    # Everything an edit can change, deps as rows
+    rows = {task: i for i, task in enumerate(project.tasks)}
+    return [
+        (
+            task.title,
+            task.length,
+            task.earliest_start,
+            bool(task.is_done),
+            task.description,
+            sorted(rows[dep] for dep in task.deps),
+        )
+        for task in project.tasks
+    ]
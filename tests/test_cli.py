@@ -0,0 +1,114 @@
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from gantty import cli, portfolio, storage
+from gantty.journal import Journal
+from tests.helpers import random_project, signature
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.file_name = self.save("plan", random_project(2))
+
+    def save(self, name, project):
+        file_name = os.path.join(self.directory, name + ".gantt")
+        project.start_date = datetime.date(2024, 3, 1)
+        storage.save(file_name, project)
+        return file_name
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cli.main(list(args))
+        return output.getvalue()
+
+    def test_export_csv(self):
+        project, _ = storage.load(self.file_name)
+        analysis = project.analyse()
+        rows = list(csv.DictReader(io.StringIO(self.run_cli("export", self.file_name))))
+        self.assertEqual(len(rows), len(project.tasks))
+        for i, (row, (title, length, _, done, _, deps)) in enumerate(zip(rows, signature(project))):
+            self.assertEqual((row["title"], int(row["length"]), row["done"]), (title, length, str(done)))
+            self.assertEqual(sorted(int(dep) for dep in row["deps"].split()), deps)
+            start = project.start_date + datetime.timedelta(days=int(analysis.start[i]))
+            self.assertEqual(row["start"], start.isoformat())
+            self.assertEqual(int(row["slack"]), analysis.slack[i])
+
+    def test_export_json_with_journal(self):
+        # Edits in the journal are part of the export
+        journal = Journal(self.file_name, storage.read_header(self.file_name)["id"])
+        journal.record("title", 0, "Renamed")
+        journal.record("add", "Added", 3)
+        journal.flush()
+        output = os.path.join(self.directory, "plan.json")
+        self.run_cli("export", self.file_name, "--format", "json", "--output", output)
+        with open(output, encoding="utf-8") as stream:
+            document = json.load(stream)
+        self.assertEqual(document["start_date"], "2024-03-01")
+        self.assertEqual(document["tasks"][0]["title"], "Renamed")
+        self.assertEqual(document["tasks"][-1]["title"], "Added")
+        self.assertEqual([task["id"] for task in document["tasks"]], list(range(41)))
+
+    def test_export_plantuml(self):
+        project, _ = storage.load(self.file_name)
+        text = self.run_cli("export", self.file_name, "-f", "plantuml")
+        self.assertTrue(text.startswith("@startgantt\n") and text.endswith("@endgantt\n"))
+        links = [line for line in text.splitlines() if " -> " in line]
+        self.assertEqual(len(links), sum(len(task.deps) for task in project.tasks))
+
+    def test_schedule_folds_the_journal(self):
+        journal = Journal(self.file_name, storage.read_header(self.file_name)["id"])
+        journal.record("length", 1, 9)
+        journal.flush()
+        self.assertIn("40 tasks", self.run_cli("schedule", self.file_name))
+        self.assertFalse(os.path.exists(journal.path))
+        project, _ = storage.load(self.file_name)
+        self.assertEqual(project.tasks[1].length, 9)
+
+    def test_missing_file(self):
+        with contextlib.redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+            cli.main(["export", os.path.join(self.directory, "missing.gantt")])
+        self.assertIn("Could not open", errors.getvalue())
+
+    def test_portfolio(self):
+        # Serial and parallel runs give the same report, in the order of the files
+        projects = {"plan": storage.load(self.file_name)[0]}
+        for seed in (5, 6):
+            projects[f"other {seed}"] = random_project(seed, 20)
+            self.save(f"other {seed}", projects[f"other {seed}"])
+        serial = portfolio.analyse([self.directory], 1)
+        self.assertEqual(portfolio.analyse([self.directory], 2), serial)
+        self.assertEqual([summary["name"] for summary in serial["summaries"]], ["Random 5", "Random 6", "Random 2"])
+        self.assertEqual(serial["tasks"], 80)
+        for summary in serial["summaries"]:
+            project = projects[os.path.basename(summary["file"])[: -len(".gantt")]]
+            analysis = project.analyse()
+            self.assertEqual(summary["total_slack"], sum(analysis.slack))
+            end = project.start_date + datetime.timedelta(days=analysis.project_end)
+            self.assertEqual(summary["end"], end.isoformat())
+        self.assertEqual(serial["end"], max(summary["end"] for summary in serial["summaries"]))
+
+    def test_portfolio_failures(self):
+        broken = os.path.join(self.directory, "broken.gantt")
+        with open(broken, "w") as stream:
+            stream.write("not a project\n")
+        output = os.path.join(self.directory, "report.json")
+        with self.assertRaises(SystemExit):
+            self.run_cli("portfolio", self.directory, "--format", "json", "--output", output, "--jobs", "2")
+        with open(output, encoding="utf-8") as stream:
+            report = json.load(stream)
+        self.assertEqual(report["projects"], 1)
+        self.assertEqual([summary["file"] for summary in report["failed"]], [broken])
+
+
+if __name__ == "__main__":
+    unittest.main()
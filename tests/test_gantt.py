@@ -0,0 +1,81 @@
+import random
+import unittest
+
+from gantty.gantt import Project, Schedule
+from tests.helpers import random_project
+
+
+class DependencyIndexTest(unittest.TestCase):
+    def check(self, project):
+        self.assertTrue(project.check_index())
+        tasks = project.tasks
+        for task in tasks:
+            self.assertEqual(set(task.dependents), {other for other in tasks if task in other.deps})
+
+        # The cached schedule matches one computed from scratch
+        fresh = Schedule(project)
+        fresh.clear()
+        self.assertEqual([project.schedule.start(task) for task in tasks], [fresh.start(task) for task in tasks])
+
+    def test_random_edits(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            project = random_project(seed)
+            self.check(project)
+            for step in range(80):
+                tasks = project.tasks
+                op = rng.choice(("add", "insert", "remove", "dep", "dep", "dep", "unlink", "length"))
+                if op == "add":
+                    project.add_task(f"Added {step}")
+                elif op == "insert":
+                    project.insert_task(rng.randrange(len(tasks) + 1), f"Inserted {step}")
+                elif op == "remove" and len(tasks) > 1:
+                    project.remove_task(rng.choice(tasks))
+                elif op == "dep":
+                    rng.choice(tasks).toggle_dep(rng.choice(tasks))
+                elif op == "unlink":
+                    task = rng.choice(tasks)
+                    if task.deps:
+                        task.remove_dep(rng.choice(task.deps))
+                else:
+                    rng.choice(tasks).length = rng.randint(1, 6)
+                self.check(project)
+
+    def test_no_cycles(self):
+        project = Project("Cycle")
+        first, second, third = (project.add_task(title) for title in ("First", "Second", "Third"))
+        self.assertTrue(second.set_dep(first))
+        self.assertTrue(third.set_dep(second))
+        self.assertFalse(first.set_dep(third))
+        self.assertEqual(list(first.deps), [])
+        self.check(project)
+
+    def test_redundant_edges_are_dropped(self):
+        project = Project("Redundant")
+        first, second, third = (project.add_task(title) for title in ("First", "Second", "Third"))
+        third.set_dep(first)
+        third.set_dep(second)
+        second.set_dep(first)
+        self.assertEqual(list(third.deps), [second])
+        self.check(project)
+
+    def test_remove_splices_deps(self):
+        project = Project("Splice")
+        first, second, third = (project.add_task(title) for title in ("First", "Second", "Third"))
+        second.set_dep(first)
+        third.set_dep(second)
+        project.remove_task(second)
+        self.assertEqual(list(third.deps), [first])
+        self.check(project)
+
+    def test_check_index_finds_mismatches(self):
+        project = random_project(1)
+        task = next(task for task in project.tasks if task.deps)
+        dep = task.deps[0]
+        project._dependents[dep] = tuple(other for other in project._dependents[dep] if other is not task) or (dep,)
+        with self.assertRaises(ValueError):
+            project.check_index()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from gantty import storage, ui
+from gantty.arrays import ArrayProject, np
+from gantty.gantt import Project
+from gantty.journal import Journal
+from gantty.keys import Keybindings
+from tests.helpers import random_project, signature
+
+EDITS = (
+    Keybindings.GROW_TASK,
+    Keybindings.SHRINK_TASK,
+    Keybindings.TOGGLE_DONE_OR_DEP,
+    Keybindings.TOGGLE_SELECT_DEPS,
+    Keybindings.TOGGLE_SELECT_DEPS,
+    Keybindings.ADD_TASK,
+    Keybindings.RENAME_TASK,
+    Keybindings.EDIT_TASK,
+    Keybindings.DELETE_TASK,
+)
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_name = os.path.join(directory.name, "history.gantt")
+
+        # Prompts answer from a list, frames are thrown away
+        self.answers = []
+        for name, value in (
+            ("get_input_text", lambda *args: self.answers.pop(0)),
+            ("get_editor_input", lambda text: text + " edited"),
+        ):
+            patcher = mock.patch.object(ui, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(ui.screen.frame, "sink", len)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def edit(self, view, rng, step):
+        # One key, returns True when it was recorded in the history
+        project = view.project
+        view.current_task = rng.randrange(len(project.tasks))
+        char = rng.choice(EDITS)
+        if char == Keybindings.ADD_TASK:
+            self.answers.append(f"Added {step}")
+        elif char == Keybindings.RENAME_TASK:
+            self.answers.append(f"Renamed {step}")
+        elif char == Keybindings.DELETE_TASK:
+            self.answers.append("yes")
+        elif char == Keybindings.TOGGLE_SELECT_DEPS:
+            view.select_deps()
+            view.current_task = rng.randrange(len(project.tasks))
+            char = Keybindings.TOGGLE_DONE_OR_DEP
+        undos = len(view.history.undos)
+        ui.apply(view, char, None, None, self.file_name)
+        view.selecting_deps = False
+        del self.answers[:]
+        return len(view.history.undos) != undos
+
+    def check_backend(self, make):
+        for seed in range(10):
+            rng = random.Random(seed)
+            project = make(random_project(seed, 30))
+            view = ui.View(project)
+            view.journal = Journal(self.file_name, storage.save(self.file_name, project))
+            states = [signature(project)]
+            for step in range(50):
+                if self.edit(view, rng, step):
+                    states.append(signature(project))
+                if len(states) > 1 and rng.random() < 0.15:
+                    steps = rng.randint(1, min(3, len(states) - 1))
+                    for _ in range(steps):
+                        self.assertTrue(view.undo())
+                    self.assertEqual(signature(project), states[-1 - steps])
+                    for _ in range(steps):
+                        self.assertTrue(view.redo())
+                    self.assertEqual(signature(project), states[-1])
+            self.assertGreater(len(states), 10)
+            if isinstance(project, Project):
+                self.assertTrue(project.check_index())
+
+            # The journal replays to the same project, also after undoing everything
+            view.journal.flush()
+            self.assertEqual(signature(storage.load_project(self.file_name)[0]), states[-1])
+            while view.undo():
+                pass
+            self.assertEqual(signature(project), states[0])
+            view.journal.flush()
+            self.assertEqual(signature(storage.load_project(self.file_name)[0]), states[0])
+            while view.redo():
+                pass
+            self.assertEqual(signature(project), states[-1])
+
+    def test_project(self):
+        self.check_backend(lambda project: project)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_arrays(self):
+        self.check_backend(ArrayProject.from_project)
+
+    def test_edit_clears_redo(self):
+        project = random_project(0, 5)
+        view = ui.View(project)
+        view.current_task = 0
+        ui.apply(view, Keybindings.GROW_TASK, None, None, self.file_name)
+        self.assertTrue(view.undo())
+        ui.apply(view, Keybindings.SHRINK_TASK, None, None, self.file_name)
+        self.assertFalse(view.redo())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from gantty import instrument
+from gantty.arrays import ArrayProject, np
+from tests.helpers import random_project
+
+READS = ("Task.start", "Task.end", "Task.extra", "Task.slack", "Task.status")
+
+
+class CountersTest(unittest.TestCase):
+    def setUp(self):
+        instrument.enable()
+        self.addCleanup(instrument.enable, False)
+
+    def reads(self, project):
+        # Counts of reading every schedule property of every task once
+        instrument.counters.clear()
+        for task in project.tasks:
+            for name in READS:
+                getattr(task, name[len("Task.") :])
+        return {name: instrument.counters.get(name, 0) for name in READS}
+
+    def test_project(self):
+        project = random_project(0, 20)
+        self.assertEqual(self.reads(project), dict.fromkeys(READS, 20))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_arrays_count_the_same(self):
+        project = random_project(0, 20)
+        self.assertEqual(self.reads(ArrayProject.from_project(project)), self.reads(project))
+
+    def test_disabled(self):
+        instrument.enable(False)
+        self.reads(random_project(0, 5))
+        self.assertEqual(instrument.counters, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
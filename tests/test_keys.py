@@ -0,0 +1,27 @@
+import unittest
+
+from gantty.keys import split_keys
+
+
+class SplitKeysTest(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(split_keys("jj+a"), (["j", "j", "+", "a"], ""))
+
+    def test_sequences(self):
+        self.assertEqual(split_keys("\x1b[Aj\x1bOB\x1b[5~"), (["\x1b[A", "j", "\x1bOB", "\x1b[5~"], ""))
+        self.assertEqual(split_keys("\x1b[1;5C"), (["\x1b[1;5C"], ""))
+
+    def test_alt(self):
+        self.assertEqual(split_keys("\x1bxk"), (["\x1bx", "k"], ""))
+
+    def test_incomplete(self):
+        # The rest is kept for the next read, unless nothing more is coming
+        self.assertEqual(split_keys("j\x1b"), (["j"], "\x1b"))
+        self.assertEqual(split_keys("j\x1b[1;"), (["j"], "\x1b[1;"))
+        self.assertEqual(split_keys("\x1bO"), ([], "\x1bO"))
+        self.assertEqual(split_keys("\x1b[1;5C", final=True), (["\x1b[1;5C"], ""))
+        self.assertEqual(split_keys("j\x1b", final=True), (["j", "\x1b"], ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
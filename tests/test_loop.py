@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from gantty import main, ui
+from gantty.main import EventLoop, RuntimeInfo
+from tests.helpers import random_project
+
+
+class TypedAheadTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.read_end, self.write_end = os.pipe()
+        self.addCleanup(os.close, self.read_end)
+        self.addCleanup(os.close, self.write_end)
+        self.info = RuntimeInfo(file_name=os.path.join(directory.name, "loop.gantt"), file_descriptor=self.read_end)
+
+        # Nothing is drawn, a prompt that has to wait for the terminal fails the test
+        for target, name in ((ui, "input"), (ui.termios, "tcsetattr")):
+            patcher = mock.patch.object(target, name, side_effect=AssertionError(name), create=name == "input")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(main, "draw")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_loop(self, view, data):
+        # Everything arrives in one read, like keys typed faster than a frame
+        os.write(self.write_end, data)
+        return asyncio.run(asyncio.wait_for(EventLoop(view, self.info).run(), 5))
+
+    def test_delete_prompt(self):
+        project = random_project(0, 5)
+        titles = [task.title for task in project.tasks]
+        view = ui.View(project)
+        view.current_task = 2
+        self.run_loop(view, b"Dyes\rjqyes\r")
+        self.assertEqual([task.title for task in project.tasks], titles[:2] + titles[3:])
+
+        # Deleting selects the task above, the j after the prompt moves back down
+        self.assertEqual(view.current_task, 2)
+
+    def test_add_prompt(self):
+        project = random_project(0, 3)
+        view = ui.View(project)
+        self.run_loop(view, b"aNew\x7fw task\rqyes\r")
+        self.assertEqual(project.tasks[-1].title, "New task")
+
+    def test_editor_drops_keys(self):
+        # Keys typed after e were meant for the editor, keys typed once it closed are commands again
+        def edit(text):
+            os.write(self.write_end, b"qyes\r")
+            return "Edited"
+
+        project = random_project(0, 3)
+        view = ui.View(project)
+        with mock.patch.object(ui, "get_editor_input", edit):
+            self.run_loop(view, b"eD")
+        self.assertEqual(len(project.tasks), 3)
+        self.assertEqual(project.tasks[0].description, "Edited")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import random
+import re
+import unittest
+
+from gantty.screen import Frame, Screen, cells, char_width, clip, text_width
+
+CONTROL = re.compile(r"\x1b\[(\d+);(\d+)H|\x1b\[[\d;]*m|\x1b\[2J")
+
+
+# Enough of a terminal to replay what a screen sends: cursor moves, clears and wide characters
+class Terminal:
+    def __init__(self, width, height):
+        self.width = width
+        self.rows = [[" "] * width for _ in range(height)]
+        self.x = self.y = 0
+
+    def feed(self, data):
+        text = bytes(data).decode()
+        i = 0
+        while i < len(text):
+            match = CONTROL.match(text, i)
+            if match:
+                if match.group(1):
+                    self.y, self.x = int(match.group(1)) - 1, int(match.group(2)) - 1
+                elif match.group(0) == "\x1b[2J":
+                    for row in self.rows:
+                        row[:] = [" "] * self.width
+                i = match.end()
+                continue
+            self.put(text[i])
+            i += 1
+        return len(data)
+
+    def put(self, char):
+        row, x, width = self.rows[self.y], self.x, char_width(char)
+        if width == 0:
+            row[x - 1] += char
+            return
+        assert x + width <= self.width, "written past the right edge"
+
+        # Writing over half a wide character blanks the other half
+        if row[x] == "" and x > 0:
+            row[x - 1] = " "
+        if x + width < self.width and row[x + width] == "":
+            row[x + width] = " "
+        row[x] = char
+        if width == 2:
+            row[x + 1] = ""
+        self.x += width
+
+
+class ScreenTest(unittest.TestCase):
+    def make(self, width, height):
+        self.sent = []
+        self.terminal = Terminal(width, height)
+        screen = Screen(Frame(sink=lambda data: self.sent.append(bytes(data)) or self.terminal.feed(data)))
+        screen.resize(width, height)
+        return screen
+
+    def rows(self, screen):
+        return [screen.chars[y * screen.width : (y + 1) * screen.width] for y in range(screen.height)]
+
+    def test_only_changes_are_sent(self):
+        screen = self.make(20, 3)
+        screen.move(2, 1)
+        screen.write("hello")
+        screen.present()
+        self.sent.clear()
+        screen.present()
+        self.assertEqual(self.sent, [])
+
+        screen.move(3, 1)
+        screen.write("a")
+        screen.present()
+        self.assertEqual(self.sent, [b"\x1b[2;4Ha"])
+
+    def test_colors(self):
+        screen = self.make(10, 1)
+        screen.present()
+        self.sent.clear()
+        screen.fg, screen.bg = 1, 2
+        screen.move(0, 0)
+        screen.write("ab")
+        screen.present()
+        self.assertEqual(self.sent, [b"\x1b[1;1H\x1b[31;42mab"])
+
+    def test_cells(self):
+        self.assertEqual(cells("a中b"), ["a", "中", "", "b"])
+        self.assertEqual(cells("é中́"), ["é", "中́", ""])
+        self.assertEqual(text_width("a中b"), 4)
+        self.assertEqual(clip("中文字", 5), "中文")
+
+    def test_wide_character_at_the_edge(self):
+        # Half a wide character does not fit, its cell is left blank
+        screen = self.make(5, 1)
+        screen.move(2, 0)
+        screen.write("ab中")
+        screen.present()
+        self.assertEqual(self.rows(screen), [[" ", " ", "a", "b", " "]])
+        self.assertEqual(self.terminal.rows, self.rows(screen))
+
+    def test_random_frames(self):
+        width, height = 30, 6
+        screen = self.make(width, height)
+        rng = random.Random(3)
+        pool = ["abc", "中文", "日本語テキスト", "x", "é", "ｆｕｌｌ", "   "]
+        for _ in range(500):
+            if rng.random() < 0.3:
+                screen.clear()
+            for _ in range(rng.randrange(1, 6)):
+                screen.move(rng.randrange(-5, width + 3), rng.randrange(height))
+                screen.write("".join(rng.choice(pool) for _ in range(rng.randrange(1, 5))))
+            screen.present()
+            self.assertEqual(self.terminal.rows, self.rows(screen))
+
+            # Every wide character is followed by its right half, and only then
+            for row in self.rows(screen):
+                for x, char in enumerate(row):
+                    if char == "":
+                        self.assertGreater(x, 0)
+                        self.assertEqual(char_width(row[x - 1][0]), 2)
+                    elif char_width(char[0]) == 2:
+                        self.assertEqual(row[x + 1], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import random
+import unittest
+from unittest import mock
+
+from gantty import ui
+from gantty.arrays import ArrayProject, np
+from gantty.gantt import Project
+from gantty.keys import Keybindings
+from gantty.search import PendingIndex, TitleIndex, build_index, matches, title_index
+
+WORDS = ["alpha", "beta", "gamma", "Délta", "epsilon", "zeta", "Straße", "中文", "test", "tester"]
+QUERIES = ["a", "al", "alp", "eta", "ta", "STR", "ss", "中", "中文", "test", "st", "pha bet", "xyz"]
+
+
+def random_title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + f" {rng.randrange(30)}"
+
+
+def brute(project, query):
+    return {id(task) for task in project.tasks if matches(query, task.title)}
+
+
+def random_edit(project, rng):
+    tasks = project.tasks
+    op = rng.randrange(3)
+    if op == 0 or len(tasks) < 2:
+        project.insert_task(rng.randrange(len(tasks) + 1), random_title(rng))
+    elif op == 1:
+        project.remove_task(rng.choice(tasks))
+    else:
+        rng.choice(tasks).title = random_title(rng)
+
+
+class TitleIndexTest(unittest.TestCase):
+    def make_project(self, rng, count=60):
+        project = Project("Search")
+        for _ in range(count):
+            project.add_task(random_title(rng))
+        return project
+
+    def check(self, project, index):
+        for query in QUERIES:
+            self.assertEqual({id(task) for task in index.find(query)}, brute(project, query), query)
+            self.assertGreaterEqual(index.estimate(query), len(brute(project, query)), query)
+
+    def check_edits(self, make):
+        for seed in range(5):
+            rng = random.Random(seed)
+            project = make(self.make_project(rng))
+            index = title_index(project)
+            self.check(project, index)
+            for _ in range(100):
+                random_edit(project, rng)
+                self.check(project, index)
+
+    def test_project(self):
+        self.check_edits(lambda project: project)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_arrays(self):
+        self.check_edits(ArrayProject.from_project)
+
+    def test_edits_while_building(self):
+        # Edits made while the worker thread builds the index are applied to it afterwards
+        rng = random.Random(7)
+        project = self.make_project(rng)
+        build = build_index(project)
+        self.assertIsInstance(project.search_index, PendingIndex)
+        self.assertIsNone(title_index(project))
+        for _ in range(50):
+            random_edit(project, rng)
+        project.search_index = build()
+        self.check(project, project.search_index)
+        for _ in range(50):
+            random_edit(project, rng)
+        self.check(project, project.search_index)
+        self.assertEqual(sorted(project.search_index.words), sorted(TitleIndex(project.tasks).words))
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ui.screen.frame, "sink", len)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rng = random.Random(3)
+        self.project = Project("Search")
+        for _ in range(200):
+            self.project.add_task(random_title(rng))
+        self.view = ui.View(self.project)
+        self.view.current_task = 50
+
+    def search(self, text):
+        ui.apply(self.view, Keybindings.SEARCH, None, None, None)
+        for char in text:
+            ui.apply(self.view, char, None, None, None)
+
+    def expected(self, query):
+        return [row for row, task in enumerate(self.project.tasks) if matches(query, task.title)]
+
+    def test_matches_in_order(self):
+        self.search("tester")
+        rows = self.expected("tester")
+        self.assertEqual(self.view.search.matches, rows)
+        self.assertEqual(self.view.current_task, min((row for row in rows if row >= 50), default=rows[0]))
+
+        # Down goes to the next match and up back, wrapping around
+        i = rows.index(self.view.current_task)
+        ui.apply(self.view, "\x1b[B", None, None, None)
+        self.assertEqual(self.view.current_task, rows[(i + 1) % len(rows)])
+        for _ in range(len(rows) + 1):
+            ui.apply(self.view, "\x1b[A", None, None, None)
+        self.assertEqual(self.view.current_task, rows[i])
+
+    def test_scan_while_indexing(self):
+        # Before the index is ready the nearest match is found by scanning
+        build_index(self.project)
+        self.search("tester")
+        self.assertIsNone(self.view.search.matches)
+        rows = self.expected("tester")
+        self.assertEqual(self.view.current_task, min((row for row in rows if row >= 50), default=rows[0]))
+        ui.apply(self.view, Keybindings.SEARCH_NEXT[0], None, None, None)
+        self.assertIn(self.view.current_task, rows)
+
+    def test_cancel(self):
+        self.search("zeta")
+        ui.apply(self.view, Keybindings.SEARCH_CANCEL, None, None, None)
+        self.assertIsNone(self.view.search)
+        self.assertEqual(self.view.current_task, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import copyreg
+import datetime
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from gantty import storage, ui
+from gantty.arrays import ArrayProject, np
+from gantty.gantt import Project, Task
+from gantty.journal import Journal
+from tests.helpers import random_project, signature
+
+
+# An object as pickled before the project format, when classes had no pickling hooks and kept everything in __dict__
+class Legacy:
+    def __init__(self, cls, state):
+        self.cls = cls
+        self.state = state
+
+    def __reduce_ex__(self, protocol):
+        return copyreg._reconstructor, (self.cls, object, None), self.state
+
+
+class StorageTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_name = os.path.join(directory.name, "project.gantt")
+
+    def test_round_trip(self):
+        project = random_project(3)
+        project.start_date = datetime.date(2024, 2, 29)
+        project.tasks[0].title = "Wide 漢字 and é"
+        storage.save(self.file_name, project, {"zoom": 2})
+        loaded, settings = storage.load(self.file_name)
+        self.assertEqual(signature(loaded), signature(project))
+        self.assertEqual((loaded.name, loaded.start_date), (project.name, project.start_date))
+        self.assertEqual(settings, {"zoom": 2})
+        self.assertTrue(loaded.check_index())
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_round_trip_arrays(self):
+        project = random_project(4)
+        storage.save(self.file_name, project)
+        loaded, _ = storage.load(self.file_name, arrays=True)
+        self.assertIsInstance(loaded, ArrayProject)
+        self.assertEqual(signature(loaded), signature(project))
+
+        # Saved again from the arrays, the file reads back the same
+        storage.save(self.file_name, loaded)
+        self.assertEqual(signature(storage.load(self.file_name)[0]), signature(project))
+
+    def test_version_1(self):
+        header = {
+            "format": storage.FORMAT,
+            "version": 1,
+            "name": "Text",
+            "start_date": "2023-05-01",
+            "columns": ["title", "length", "earliest_start", "is_done", "description", "deps"],
+            "settings": {"zoom": 1},
+        }
+        rows = [["First", 2, 0, False, "", []], ["Second", 1, 1, True, "notes", [0]], ["Third", 3, 0, False, "", [2]]]
+        with open(self.file_name, "w", encoding="utf-8") as stream:
+            stream.writelines(json.dumps(line) + "\n" for line in [header] + rows)
+        project, settings = storage.load(self.file_name)
+        self.assertEqual(
+            signature(project),
+            [("First", 2, 0, False, "", []), ("Second", 1, 1, True, "notes", [0]), ("Third", 3, 0, False, "", [2])],
+        )
+        self.assertEqual(project.start_date, datetime.date(2023, 5, 1))
+        self.assertEqual(settings, {"zoom": 1})
+
+    def test_legacy_pickle(self):
+        project = Legacy(Project, {"name": "Legacy", "start_date": datetime.date(2023, 1, 2)})
+        tasks = []
+        for i in range(4):
+            state = {"title": f"Task {i}", "is_done": i == 0, "length": i + 1, "earliest_start": 0}
+            state.update(description="notes" if i == 2 else "", deps=tasks[-2:], project=project)
+            tasks.append(Legacy(Task, state))
+        project.state["tasks"] = tasks
+        view = {"project": project, "view": 1, "column_width": 5, "task_width": 20, "current_task": 0}
+        with open(self.file_name, "wb") as stream:
+            pickle.dump(Legacy(ui.View, view), stream)
+
+        loaded, settings = storage.load(self.file_name)
+        self.assertEqual(
+            signature(loaded),
+            [
+                ("Task 0", 1, 0, True, "", []),
+                ("Task 1", 2, 0, False, "", [0]),
+                ("Task 2", 3, 0, False, "notes", [0, 1]),
+                ("Task 3", 4, 0, False, "", [1, 2]),
+            ],
+        )
+        self.assertEqual((loaded.name, loaded.start_date), ("Legacy", datetime.date(2023, 1, 2)))
+        self.assertEqual(settings, {"zoom": 1, "column_width": 5, "task_width": 20})
+        self.assertTrue(loaded.check_index())
+        self.assertEqual(loaded.tasks[3].start, 6)
+
+    def test_journal(self):
+        project = random_project(5, 10)
+        journal = Journal(self.file_name, storage.save(self.file_name, project))
+        for record in (("add", "Added", 2), ("length", 0, 4), ("dep", 10, 0), ("title", 1, "Renamed")):
+            journal.record(*record)
+        journal.flush()
+
+        # A record cut short by a crash is left out, and dropped from the file when repairing
+        with open(journal.path, "ab") as stream:
+            stream.write(b'["delete", 0')
+        loaded, _, _ = storage.load_project(self.file_name)
+        self.assertEqual(loaded.tasks[10].title, "Added")
+        self.assertEqual(loaded.tasks[0].length, 4)
+        self.assertEqual(list(loaded.tasks[10].deps), [loaded.tasks[0]])
+        self.assertEqual(loaded.tasks[1].title, "Renamed")
+        storage.load_project(self.file_name, repair=True)
+        self.assertEqual(os.path.getsize(journal.path), journal.bytes)
+
+    def test_journal_of_other_snapshot(self):
+        project = random_project(6, 10)
+        journal = Journal(self.file_name, storage.save(self.file_name, project))
+        journal.record("title", 0, "Old")
+        journal.flush()
+        storage.save(self.file_name, project)
+        self.assertEqual(signature(storage.load_project(self.file_name)[0]), signature(project))
+
+
+if __name__ == "__main__":
+    unittest.main()
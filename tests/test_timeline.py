@@ -0,0 +1,106 @@
+import datetime
+import unittest
+from unittest import mock
+
+from gantty import ui
+from gantty.gantt import Project
+from gantty.ui import Constants, Timeline
+
+
+class TimelineTest(unittest.TestCase):
+    def make_view(self, project, zoom=Constants.DAY, offset=0):
+        view = ui.View(project)
+        view.width, view.height = 60, 12
+        view.task_width = 20
+        view.column_width = 4
+        view.view = zoom
+        view.first_date_offset = offset
+        return view
+
+    def setUp(self):
+        patcher = mock.patch.object(ui.screen.frame, "sink", len)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.project = Project("Timeline")
+        self.project.start_date = datetime.date(2024, 1, 15)
+
+    def test_month_and_quarter_columns(self):
+        view = self.make_view(self.project, Constants.MONTH)
+        self.assertEqual(
+            [view.column_date(i) for i in range(3)],
+            [datetime.date(2024, 1, 1), datetime.date(2024, 2, 1), datetime.date(2024, 3, 1)],
+        )
+        view.view = Constants.QUARTER
+        self.assertEqual(
+            [view.column_date(i) for i in range(-1, 4)],
+            [
+                datetime.date(2023, 10, 1),
+                datetime.date(2024, 1, 1),
+                datetime.date(2024, 4, 1),
+                datetime.date(2024, 7, 1),
+                datetime.date(2024, 10, 1),
+            ],
+        )
+
+    def test_zoom_cycles(self):
+        view = self.make_view(self.project)
+        zooms = []
+        for _ in range(5):
+            zooms.append(view.view)
+            view.toggle_view()
+        self.assertEqual(zooms, [Constants.DAY, Constants.WEEK, Constants.MONTH, Constants.QUARTER, Constants.DAY])
+
+    def test_pan_by_month(self):
+        view = self.make_view(self.project, Constants.MONTH)
+        view.pan_right()
+        self.assertEqual(view.first_date, datetime.date(2024, 2, 1))
+        view.pan_right(2)
+        self.assertEqual(view.first_date, datetime.date(2024, 4, 1))
+        view.pan_left(5)
+        self.assertEqual(view.first_date, self.project.start_date)
+
+    def test_x_follows_the_calendar(self):
+        # Columns hold 31, 29 and 31 days in 2024, the project starts half way into January
+        view = self.make_view(self.project, Constants.MONTH)
+        timeline = Timeline(view)
+        self.assertEqual(timeline.x(17), 4)
+        self.assertEqual(timeline.x(17 + 29), 8)
+        self.assertEqual(timeline.x(-14), 0)
+        for x in range(timeline.width):
+            self.assertEqual(timeline.x(timeline.day(x)), x)
+
+    def cells(self, y):
+        screen = ui.screen
+        row = slice(y * screen.width, (y + 1) * screen.width)
+        return screen.chars[row], screen.bgs[row]
+
+    def test_bars_are_clipped_to_the_grid(self):
+        # A long task and a short one whose slack runs past both ends of the grid
+        long = self.project.add_task("Long", 1000)
+        short = self.project.add_task("Short", 1)
+        view = self.make_view(self.project, offset=100)
+        ui.draw(view)
+        analysis = self.project.analyse()
+        timeline = Timeline(view)
+
+        chars, bgs = self.cells(Constants.TASK_Y_OFFSET)
+        self.assertEqual(chars[view.task_width :], [" "] * timeline.width)
+        self.assertEqual(set(bgs[view.task_width :]), {ui.get_task_color(view, long, analysis.status[0])})
+        chars, bgs = self.cells(Constants.TASK_Y_OFFSET + 2)
+        self.assertEqual(chars[view.task_width :], ["▒"] * timeline.width)
+        self.assertEqual(set(bgs[view.task_width :]), {ui.get_task_color(view, short, analysis.status[1])})
+
+        # The title column is left alone
+        self.assertEqual("".join(chars[: view.task_width]).rstrip(), " Short")
+
+    def test_short_tasks_keep_a_cell(self):
+        self.project.add_task("Day", 1)
+        view = self.make_view(self.project, Constants.QUARTER)
+        ui.draw(view)
+        chars, bgs = self.cells(Constants.TASK_Y_OFFSET)
+        color = ui.get_task_color(view, self.project.tasks[0], self.project.analyse().status[0])
+        self.assertEqual([x for x, bg in enumerate(bgs) if bg == color and x >= view.task_width], [view.task_width])
+
+
+if __name__ == "__main__":
+    unittest.main()